@@ -0,0 +1,5 @@
+""" Benchmarks of firecracker.
+
+The asv suite (asv.conf.json at the repository root) is made of the
+bench_*.py modules, with data from fixtures.py. The other modules are
+scripts, run on their own."""
@@ -0,0 +1,63 @@
+""" Throughput of firecracker_many: figures per second for 1, 2, 4 ... worker
+processes, up to the number of CPUs, rendering a night's worth of ERP-sized
+jobs (the bundled subjects, repeated).
+
+Run from the repository root:
+
+    $ python benchmarks/batch_throughput.py [number_of_jobs]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DATA = os.path.join(ROOT, "examples", "data")
+
+
+def erp_jobs(number_jobs):
+    from firecracker.io import load_bin
+
+    ms = np.arange(start=-1000, stop=1000+2, step=2)
+    subjects = [load_bin(os.path.join(DATA, "MERP_S%d.bin" % subject_id),
+                         number_series=14, time=ms)[0]
+                for subject_id in (4, 7)]
+    return [dict(M=subjects[i % 2], time=ms, label_colorbar="Voltage",
+                 xlim_global=[-900, 600], times_vert_lines=0,
+                 y_range_type="symmetric_around_zero", layers=bool(i % 2),
+                 name="job_%04d" % i)
+            for i in range(number_jobs)]
+
+
+def main():
+    from firecracker import firecracker_many
+
+    number_jobs = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    jobs = erp_jobs(number_jobs)
+    cpus = os.cpu_count() or 1
+    counts = sorted({min(2**k, cpus) for k in range(cpus.bit_length() + 1)})
+    print("{:>8s} {:>10s} {:>12s} {:>10s}".format("workers", "seconds",
+                                                  "figures/s", "speed-up"))
+    base = None
+    with tempfile.TemporaryDirectory() as out_dir:
+        for workers in counts:
+            t0 = time.perf_counter()
+            results = firecracker_many(jobs, out_dir, workers=workers)
+            seconds = time.perf_counter() - t0
+            failed = [r for r in results if r["error"] is not None]
+            assert not failed, failed[0]["error"]
+            rate = number_jobs / seconds
+            base = base or rate
+            print("{:8d} {:10.2f} {:12.2f} {:10.2f}".format(
+                workers, seconds, rate, rate / base))
+
+
+if __name__ == "__main__":
+    # Only when run as a script: asv imports this module too, while it
+    #   looks for benchmarks.
+    sys.path.insert(0, ROOT)
+    main()
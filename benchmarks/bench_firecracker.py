@@ -0,0 +1,481 @@
+""" asv benchmarks of firecracker(): time and memory, end to end and per
+phase, over series count, frame count, layers, upsample, y_range_type,
+backend, single or many Axes and output format; float32 data and
+memory_budget; rasterized vector output; geometry export against SVG;
+zooming; animation against a new figure per video frame; percentiles from
+QuantileSketch against np.percentile; the hits of RenderCache; folding and
+filtering recordings.
+
+End to end is firecracker() followed by drawing the canvas, since
+matplotlib defers most of the work to the draw. The phases are _prepare()
+(checks, limits, decimation and upsampling, colors), _render() (artists),
+the draw and savefig. Figures are made with pyplot=False, so that none are
+left open between runs.
+
+Memory is measured two ways: asv's peakmem_ (peak resident size of the
+process, setup included) and track_*_bytes, the peak of memory allocated by
+Python and numpy during the call alone, from tracemalloc.
+"""
+
+import io
+import shutil
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+from firecracker import RenderCache, animate, export_geometry, firecracker
+from firecracker.cache import _key
+from firecracker.core import _prepare, _render
+from firecracker.limits import data_stats
+from firecracker.preprocess import estimate_period, filter_frames, fold
+
+from .fixtures import DATASETS, random_walks
+
+
+def _end_to_end(kwargs):
+    fig = firecracker(**kwargs)
+    fig.canvas.draw()
+    return fig
+
+
+def _traced_peak(function, *args, **kwargs):
+    """Peak bytes allocated while function runs, as traced by tracemalloc."""
+    tracemalloc.start()
+    try:
+        function(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+class Datasets:
+    """The bundled examples, end to end."""
+    params = (list(DATASETS), [False, True], ["scatter", "line"])
+    param_names = ["dataset", "layers", "gradient"]
+
+    def setup(self, dataset, layers, gradient):
+        self.kwargs = dict(DATASETS[dataset](), layers=layers,
+                           gradient=gradient, pyplot=False)
+
+    def time_firecracker(self, dataset, layers, gradient):
+        _end_to_end(self.kwargs)
+
+    def peakmem_firecracker(self, dataset, layers, gradient):
+        _end_to_end(self.kwargs)
+
+    def track_firecracker_bytes(self, dataset, layers, gradient):
+        return _traced_peak(_end_to_end, self.kwargs)
+    track_firecracker_bytes.unit = "bytes"
+
+
+class Phases:
+    """The bundled examples, one phase at a time."""
+    params = (list(DATASETS), [False, True], ["matplotlib", "raster"])
+    param_names = ["dataset", "layers", "backend"]
+
+    def setup(self, dataset, layers, backend):
+        self.kwargs = dict(DATASETS[dataset](), layers=layers,
+                           backend=backend, pyplot=False)
+        self.label = self.kwargs.pop("label_colorbar")
+        self.args = _prepare(**self.kwargs)
+        self.fig = _render(_prepare(**self.kwargs), self.label)
+
+    def time_prepare(self, dataset, layers, backend):
+        _prepare(**self.kwargs)
+
+    def time_render(self, dataset, layers, backend):
+        _render(self.args, self.label)
+
+    def time_draw(self, dataset, layers, backend):
+        self.fig.canvas.draw()
+
+    def track_prepare_bytes(self, dataset, layers, backend):
+        return _traced_peak(_prepare, **self.kwargs)
+    track_prepare_bytes.unit = "bytes"
+
+    def track_render_bytes(self, dataset, layers, backend):
+        return _traced_peak(_render, self.args, self.label)
+    track_render_bytes.unit = "bytes"
+
+    def track_draw_bytes(self, dataset, layers, backend):
+        return _traced_peak(self.fig.canvas.draw)
+    track_draw_bytes.unit = "bytes"
+
+
+class Output:
+    """savefig of a drawn figure to each file format."""
+    params = (list(DATASETS), [False, True], ["png", "svg", "pdf"])
+    param_names = ["dataset", "layers", "format"]
+
+    def setup(self, dataset, layers, format):
+        kwargs = dict(DATASETS[dataset](), layers=layers, pyplot=False)
+        self.fig = _end_to_end(kwargs)
+
+    def _save(self, format):
+        buffer = io.BytesIO()
+        self.fig.savefig(buffer, format=format, bbox_inches="tight")
+        return buffer.tell()
+
+    def time_savefig(self, dataset, layers, format):
+        self._save(format)
+
+    def track_savefig_bytes(self, dataset, layers, format):
+        return _traced_peak(self._save, format)
+    track_savefig_bytes.unit = "bytes"
+
+    def track_file_size(self, dataset, layers, format):
+        return self._save(format)
+    track_file_size.unit = "bytes"
+
+
+class Export:
+    """export_geometry() of the bundled examples and of 14 series of 1e6
+    frames, against an SVG of the same figure."""
+    params = (list(DATASETS) + ["random_walks"], [False, True])
+    param_names = ["dataset", "layers"]
+
+    def setup(self, dataset, layers):
+        if dataset == "random_walks":
+            self.kwargs = dict(random_walks(10**6, 14), decimate="auto")
+        else:
+            self.kwargs = DATASETS[dataset]()
+        self.kwargs['layers'] = layers
+
+    def time_export(self, dataset, layers):
+        export_geometry(None, **self.kwargs)
+
+    def track_payload_bytes(self, dataset, layers):
+        return export_geometry(None, **self.kwargs)['bytes']
+    track_payload_bytes.unit = "bytes"
+
+    def track_svg_bytes(self, dataset, layers):
+        buffer = io.BytesIO()
+        fig = firecracker(**dict(self.kwargs, pyplot=False))
+        fig.savefig(buffer, format="svg", bbox_inches="tight")
+        return buffer.tell()
+    track_svg_bytes.unit = "bytes"
+
+
+class Hybrid:
+    """Vector output with the series rasterized, or as vectors."""
+    params = (list(DATASETS), ["svg", "pdf"], [False, True])
+    param_names = ["dataset", "format", "rasterize"]
+
+    def setup(self, dataset, format, rasterize):
+        kwargs = dict(DATASETS[dataset](), rasterize=rasterize,
+                      pyplot=False)
+        self.fig = _end_to_end(kwargs)
+
+    def _save(self, format):
+        buffer = io.BytesIO()
+        self.fig.savefig(buffer, format=format, bbox_inches="tight")
+        return buffer.tell()
+
+    def time_savefig(self, dataset, format, rasterize):
+        self._save(format)
+
+    def track_file_size(self, dataset, format, rasterize):
+        return self._save(format)
+    track_file_size.unit = "bytes"
+
+
+class SeriesCount:
+    """Synthetic data: 1000 frames of 14 to 5000 series."""
+    params = ([14, 100, 1000, 5000], [False, True], ["matplotlib", "raster"])
+    param_names = ["number_series", "layers", "backend"]
+    number = 1
+    repeat = (1, 3, 120.0)
+    timeout = 1200
+
+    def setup(self, number_series, layers, backend):
+        self.kwargs = dict(random_walks(1000, number_series), layers=layers,
+                           backend=backend, pyplot=False)
+
+    def time_firecracker(self, number_series, layers, backend):
+        _end_to_end(self.kwargs)
+
+    def peakmem_firecracker(self, number_series, layers, backend):
+        _end_to_end(self.kwargs)
+
+    def track_firecracker_bytes(self, number_series, layers, backend):
+        return _traced_peak(_end_to_end, self.kwargs)
+    track_firecracker_bytes.unit = "bytes"
+
+
+class SingleAxes:
+    """Synthetic data: 1000 frames of 14 to 5000 series, one Axes per
+    series or all on one."""
+    params = ([14, 100, 1000, 5000], [False, True], ["scatter", "line"])
+    param_names = ["number_series", "single_axes", "gradient"]
+    number = 1
+    repeat = (1, 3, 120.0)
+    timeout = 1200
+
+    def setup(self, number_series, single_axes, gradient):
+        self.kwargs = dict(random_walks(1000, number_series),
+                           single_axes=single_axes, gradient=gradient,
+                           pyplot=False)
+        self.label = self.kwargs.pop("label_colorbar")
+        self.args = _prepare(**self.kwargs)
+
+    def time_render(self, number_series, single_axes, gradient):
+        _render(self.args, self.label)
+
+    def time_firecracker(self, number_series, single_axes, gradient):
+        _end_to_end(dict(self.kwargs, label_colorbar=self.label))
+
+
+class FrameCount:
+    """Synthetic data: 14 series of 1e3 to 1e7 frames."""
+    params = ([10**3, 10**4, 10**5, 10**6, 10**7], [None, "auto"],
+              [False, True])
+    param_names = ["number_frames", "decimate", "layers"]
+    number = 1
+    repeat = (1, 3, 120.0)
+    timeout = 1200
+
+    def setup(self, number_frames, decimate, layers):
+        if decimate is None and number_frames > 10**5:
+            # A marker per frame: minutes per figure, nothing to learn.
+            raise NotImplementedError
+        self.kwargs = dict(random_walks(number_frames, 14), layers=layers,
+                           decimate=decimate, pyplot=False)
+
+    def time_firecracker(self, number_frames, decimate, layers):
+        _end_to_end(self.kwargs)
+
+    def peakmem_firecracker(self, number_frames, decimate, layers):
+        _end_to_end(self.kwargs)
+
+    def track_firecracker_bytes(self, number_frames, decimate, layers):
+        return _traced_peak(_end_to_end, self.kwargs)
+    track_firecracker_bytes.unit = "bytes"
+
+
+class Memory:
+    """Peak memory of 14 series of 1e6 frames, float32 or float64, upsampled
+    4 times, with and without a memory_budget."""
+    params = (["float32", "float64"], [None, 50 * 2**20],
+              ["scatter", "line"])
+    param_names = ["dtype", "memory_budget", "gradient"]
+    number = 1
+    repeat = (1, 3, 120.0)
+    timeout = 1200
+
+    def setup(self, dtype, memory_budget, gradient):
+        self.kwargs = random_walks(10**6, 14)
+        self.kwargs['M'] = self.kwargs['M'].astype(dtype)
+        # Without a budget, a fixed number of buckets.
+        self.kwargs.update(memory_budget=memory_budget, gradient=gradient,
+                           upsample=4, pyplot=False,
+                           decimate=None if memory_budget else 2000)
+
+    def time_firecracker(self, dtype, memory_budget, gradient):
+        _end_to_end(self.kwargs)
+
+    def peakmem_firecracker(self, dtype, memory_budget, gradient):
+        _end_to_end(self.kwargs)
+
+    def track_firecracker_bytes(self, dtype, memory_budget, gradient):
+        return _traced_peak(_end_to_end, self.kwargs)
+    track_firecracker_bytes.unit = "bytes"
+
+
+class Zoom:
+    """Frames reduced again on zoom (zoom_detail): one set_xlim() on a
+    decimated figure of 14 series of 1e6 frames."""
+    params = ([False, True], ["matplotlib", "raster"], [0.001, 0.1, 1.0])
+    param_names = ["layers", "backend", "fraction"]
+
+    def setup(self, layers, backend, fraction):
+        kwargs = dict(random_walks(10**6, 14), layers=layers,
+                      backend=backend, decimate="auto", pyplot=False)
+        self.fig = _end_to_end(kwargs)
+        self.ax = self.fig.axes[0]
+        start, stop = self.ax.get_xlim()
+        self.xlim = (start, start + fraction * (stop - start))
+
+    def time_zoom(self, layers, backend, fraction):
+        self.ax.set_xlim(self.xlim)
+
+
+class Animation:
+    """Video frames of a window of 2000 frames sliding by 500 along 14
+    series of 20000: animate(), which updates one figure and blits the
+    data, against a new figure per video frame."""
+    params = (["animate", "naive"], ["matplotlib", "raster"],
+              ["scatter", "line"])
+    param_names = ["method", "backend", "gradient"]
+    number = 1
+    repeat = (1, 3, 120.0)
+    timeout = 1200
+    window = 2000
+    step = 500
+
+    def setup(self, method, backend, gradient):
+        self.kwargs = dict(random_walks(20000, 14), backend=backend,
+                           gradient=gradient)
+
+    def _frames(self, method):
+        kwargs = self.kwargs
+        M = kwargs['M']
+        time = kwargs['time']
+        if method == "animate":
+            return animate(lambda rgba: None, window=self.window,
+                           step=self.step, **kwargs)['frames']
+        starts = range(0, M.shape[0] - self.window + 1, self.step)
+        for first in starts:
+            stop = first + self.window
+            fig = _end_to_end(dict(kwargs, M=M[first:stop],
+                                   time=time[first:stop] - time[first],
+                                   xlim_global=[0, time[self.window - 1]],
+                                   pyplot=False))
+            np.asarray(fig.canvas.buffer_rgba())
+        return len(starts)
+
+    def time_frames(self, method, backend, gradient):
+        self._frames(method)
+
+    def peakmem_frames(self, method, backend, gradient):
+        self._frames(method)
+
+
+class Upsample:
+    """Upsampling of the bundled examples."""
+    params = (list(DATASETS), [1, 4, "adaptive"], [False, True])
+    param_names = ["dataset", "upsample", "layers"]
+
+    def setup(self, dataset, upsample, layers):
+        self.kwargs = dict(DATASETS[dataset](), upsample=upsample,
+                           layers=layers, pyplot=False)
+
+    def time_firecracker(self, dataset, upsample, layers):
+        _end_to_end(self.kwargs)
+
+    def peakmem_firecracker(self, dataset, upsample, layers):
+        _end_to_end(self.kwargs)
+
+    def time_prepare(self, dataset, upsample, layers):
+        kwargs = dict(self.kwargs)
+        kwargs.pop("label_colorbar")
+        _prepare(**kwargs)
+
+    def track_frames_drawn(self, dataset, upsample, layers):
+        kwargs = dict(self.kwargs)
+        kwargs.pop("label_colorbar")
+        return _prepare(**kwargs)['M'].shape[0]
+    track_frames_drawn.unit = "frames"
+
+
+class RangeTypes:
+    """Every y_range_type, on the bundled examples."""
+    params = (list(DATASETS),
+              ["min_to_max", "symmetric_around_zero", "zero_to_max",
+               "percentile"],
+              [False, True])
+    param_names = ["dataset", "y_range_type", "layers"]
+
+    def setup(self, dataset, y_range_type, layers):
+        self.kwargs = dict(DATASETS[dataset](), y_range_type=y_range_type,
+                           layers=layers, pyplot=False)
+
+    def time_firecracker(self, dataset, y_range_type, layers):
+        _end_to_end(self.kwargs)
+
+    def peakmem_firecracker(self, dataset, y_range_type, layers):
+        _end_to_end(self.kwargs)
+
+
+class Quantiles:
+    """The 1st and 99th percentiles of 14 series of 1e6 frames: one chunked
+    pass of QuantileSketch (data_stats()), at each error, against
+    np.percentile of all values; and how far off the sketch's are."""
+    params = (["sketch", "numpy"], [0.01, 0.001, 0.0001])
+    param_names = ["method", "error"]
+    timeout = 600
+
+    def setup(self, method, error):
+        self.M = random_walks(10**6, 14)['M']
+
+    def _percentiles(self, method, error):
+        if method == "numpy":
+            return np.percentile(self.M, [1, 99])
+        return data_stats(self.M, error)['sketch'].quantile([0.01, 0.99])
+
+    def time_percentiles(self, method, error):
+        self._percentiles(method, error)
+
+    def peakmem_percentiles(self, method, error):
+        self._percentiles(method, error)
+
+    def track_rank_error(self, method, error):
+        """Largest distance, in fraction of all values, of the ranks of
+        the estimates from 0.01 and 0.99."""
+        values = np.sort(self.M, axis=None)
+        estimates = self._percentiles(method, error)
+        ranks = np.searchsorted(values, estimates) / values.size
+        return float(np.max(np.abs(ranks - [0.01, 0.99])))
+    track_rank_error.unit = "fraction"
+
+
+class Cache:
+    """RenderCache hits from each tier, and the key of a request."""
+    params = (list(DATASETS), ["png", "svg"])
+    param_names = ["dataset", "format"]
+
+    def setup(self, dataset, format):
+        self.directory = tempfile.mkdtemp()
+        self.kwargs = dict(DATASETS[dataset](), format=format)
+        self.cache = RenderCache(directory=self.directory)
+        self.cache.savefig(**self.kwargs)
+
+    def teardown(self, dataset, format):
+        shutil.rmtree(self.directory)
+
+    def time_memory_hit(self, dataset, format):
+        self.cache.savefig(**self.kwargs)
+
+    def time_disk_hit(self, dataset, format):
+        RenderCache(directory=self.directory).savefig(**self.kwargs)
+
+    def time_key(self, dataset, format):
+        _key(self.kwargs['M'], self.kwargs['time'], self.kwargs, ())
+
+
+class Fold:
+    """Period estimation and folding of a long synthetic recording."""
+    params = ([10**5, 10**6, 10**7], [300.0, 299.95])
+    param_names = ["number_frames", "period"]
+
+    def setup(self, number_frames, period):
+        rng = np.random.default_rng(0)
+        phase = np.arange(number_frames) % period
+        self.signal = (np.exp(-(phase - period / 2) ** 2 / 50) +
+                       rng.normal(0, 0.1, number_frames))
+
+    def time_estimate_period(self, number_frames, period):
+        estimate_period(self.signal)
+
+    def time_fold(self, number_frames, period):
+        fold(self.signal, period)
+
+    def peakmem_fold(self, number_frames, period):
+        fold(self.signal, period)
+
+
+class Filter:
+    """diff and smooth of synthetic data, kernels short and long."""
+    params = ([14, 1000], [7, 63, 501])
+    param_names = ["number_series", "window"]
+
+    def setup(self, number_series, window):
+        data = random_walks(10**5, number_series)
+        self.M = data['M']
+        self.time = data['time']
+
+    def time_filter_frames(self, number_series, window):
+        filter_frames(self.M, self.time, window, 1)
+
+    def peakmem_filter_frames(self, number_series, window):
+        filter_frames(self.M, self.time, window, 1)
@@ -0,0 +1,55 @@
+""" Data for the benchmarks: synthetic series of any size and the bundled
+ERP and pulsar examples, each as keyword arguments of firecracker()."""
+
+import os
+
+import numpy as np
+
+from firecracker.io import load_bin, load_long
+
+DATA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(
+    __file__))), "examples", "data")
+
+
+def random_walks(number_frames, number_series, seed=0):
+    """Smooth random walks, one per series, as firecracker() kwargs.
+
+    Made a block of frames at a time in float64, so that 1e7 frames need no
+    more memory than the result itself.
+    """
+    rng = np.random.default_rng(seed)
+    M = np.empty((number_frames, number_series))
+    start = np.zeros(number_series)
+    block = max(2**22 // number_series, 1)
+    for first in range(0, number_frames, block):
+        steps = rng.standard_normal((min(block, number_frames - first),
+                                     number_series))
+        M[first:first + steps.shape[0]] = start + np.cumsum(steps, axis=0)
+        start = M[first + steps.shape[0] - 1]
+    time = np.arange(number_frames, dtype=float)
+    return dict(M=M, time=time, label_colorbar="Value")
+
+
+def erp():
+    """Mean ERP of subject 7: 14 series x 1001 frames."""
+    ms = np.arange(start=-1000, stop=1000+2, step=2)
+    M, time = load_bin(os.path.join(DATA, "MERP_S7.bin"), number_series=14,
+                       time=ms)
+    event_a_ms = np.append(np.arange(0, 600+50, 50) * -1 - 250, None)
+    ISI = [str(v)+" ms" for v in list(np.arange(0, 600+50, 50))]
+    ISI.append("N170")
+    return dict(M=M, time=time, label_colorbar="Voltage",
+                times_markers=event_a_ms, xlim_global=[-900, 600],
+                times_vert_lines=0, y_range_type="symmetric_around_zero",
+                labels_series=ISI)
+
+
+def pulsar():
+    """Pulsar PSR B1919+21: 80 series x 300 frames."""
+    M, time = load_long(os.path.join(DATA, "pulsar_readable.csv"),
+                        number_series=80, cache=False)
+    return dict(M=M, time=time, label_colorbar="Radio intensity",
+                xlim_global=[0, time[-1]], y_range_type="min_to_max")
+
+
+DATASETS = {"erp": erp, "pulsar": pulsar}
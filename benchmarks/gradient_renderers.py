@@ -0,0 +1,96 @@
+""" Compare the "scatter" and "line" gradient renderers of firecracker on the
+bundled ERP and pulsar examples: time to build, draw and save each figure,
+and the size of the saved PNG and SVG output.
+
+Run from the repository root:
+
+    $ python benchmarks/gradient_renderers.py
+"""
+
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA = os.path.join(ROOT, "examples", "data")
+
+
+def erp_case():
+    number_series = 14
+    ms = np.arange(start=-1000, stop=1000+2, step=2)
+    M = np.fromfile(os.path.join(DATA, "MERP_S7.bin"))
+    M = M.reshape((-1, number_series), order='F')
+    event_a_ms = np.append(np.arange(0, 600+50, 50) * -1 - 250, None)
+    ISI = [str(v)+" ms" for v in list(np.arange(0, 600+50, 50))]
+    ISI.append("N170")
+    kwargs = dict(label_colorbar="Voltage", times_markers=event_a_ms,
+                  xlim_global=[-900, 600], times_vert_lines=0,
+                  y_range_type="symmetric_around_zero", labels_series=ISI,
+                  layers=True)
+    return M, ms, kwargs
+
+
+def pulsar_case():
+    table = np.loadtxt(os.path.join(DATA, "pulsar_readable.csv"),
+                       delimiter=",")
+    ne = 80
+    nf = int(table.shape[0] / ne)
+    epochs = np.transpose(table[:, 1].reshape((ne, nf)))
+    ms_epoch = table[0:nf, 0]
+    kwargs = dict(label_colorbar="Radio intensity",
+                  xlim_global=[0, ms_epoch[-1]], y_range_type="min_to_max",
+                  layers=True)
+    return epochs, ms_epoch, kwargs
+
+
+def measure(M, time_, kwargs, repeats=3):
+    """Best-of-repeats timings (seconds) and output sizes (bytes)."""
+    import matplotlib.pyplot as plt
+    from firecracker import firecracker
+
+    result = {}
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fig = firecracker(M, time_, **kwargs)
+        t1 = time.perf_counter()
+        fig.canvas.draw()
+        t2 = time.perf_counter()
+        sizes = {}
+        for fmt in ("png", "svg"):
+            buf = io.BytesIO()
+            fig.savefig(buf, format=fmt, bbox_inches='tight')
+            sizes[fmt] = buf.tell()
+        t3 = time.perf_counter()
+        plt.close(fig)
+        timing = {"build": t1 - t0, "draw": t2 - t1, "save": t3 - t2}
+        for key, value in timing.items():
+            result[key] = min(result.get(key, np.inf), value)
+    result.update({fmt + "_bytes": n for fmt, n in sizes.items()})
+    return result
+
+
+def main():
+    cases = [("ERP", erp_case(), 1), ("pulsar", pulsar_case(), 4),
+             ("pulsar", pulsar_case(), 1)]
+    header = "{:8s} {:8s} {:>8s} {:>8s} {:>8s} {:>8s} {:>10s} {:>10s}"
+    row = "{:8s} {:8s} {:8d} {:8.3f} {:8.3f} {:8.3f} {:10d} {:10d}"
+    print(header.format("data", "gradient", "upsample", "build", "draw",
+                        "save", "png bytes", "svg bytes"))
+    for name, (M, time_, kwargs), upsample in cases:
+        for gradient in ("scatter", "line"):
+            r = measure(M, time_, dict(kwargs, upsample=upsample,
+                                       gradient=gradient))
+            print(row.format(name, gradient, upsample, r["build"], r["draw"],
+                             r["save"], r["png_bytes"], r["svg_bytes"]))
+
+
+if __name__ == "__main__":
+    # Only when run as a script: asv imports this module too, while it
+    #   looks for benchmarks.
+    import matplotlib
+    matplotlib.use("Agg")
+    sys.path.insert(0, ROOT)
+    main()
@@ -1,8 +1,7 @@
 import csv
 import numpy as np
-from scipy import signal
 import matplotlib.pyplot as plt
-from firecracker_time_series import firecracker_time_series
+from firecracker import firecracker
 
 # 6 "Admin2" county (Montgomery)
 # 7 "Province_State" (Alabama)
@@ -72,30 +71,17 @@ M = np.transpose(sub_cases[near_to_far_ind[0:do_n_counties-1], :])
 C = sub_counties[near_to_far_ind[0:do_n_counties-1]]
 D = distance_km[near_to_far_ind[0:do_n_counties-1]]
 
-G = np.diff(M, axis=0)
-index = np.arange(0, G.shape[0]) + 1
+day = np.arange(M.shape[0])
 
-win_len = 7
-win = signal.hann(win_len)
-
-temp_win = np.zeros((win_len,))
-temp_win[3] = 1
-index_of_filt_G = signal.convolve(index, temp_win, mode='valid')
-
-filt_G = np.zeros((index_of_filt_G.shape[0], do_n_counties))
-for i in range(G.shape[1]):
-    filt_G[:, i] = signal.convolve(G[:, i], win, mode='valid') / sum(win)
-
-xlim_global = [min(index_of_filt_G), max(index_of_filt_G)]
+# Daily new cases (diff), smoothed over a week with a Hann window (smooth).
+#   Each day is placed at the middle of its week.
 y_range_type = "zero_to_max"
-y_value_label = "Confirmed cases"
+label_colorbar = "Confirmed cases"
 
 # --------------------------------------------------------------
 # Make figure.
-fig = firecracker_time_series(filt_G, time=index_of_filt_G,
-                              y_value_label=y_value_label, events=None,
-                              xlim_global=xlim_global, verticals=None,
-                              y_range_type=y_range_type, y_scale="log")
+fig = firecracker(M, time=day, label_colorbar=label_colorbar, diff=1,
+                  smooth=7, y_range_type=y_range_type, y_scale="log")
 
 # Label x axis.
 xl_txt = "Day since first case in US"
@@ -139,36 +125,21 @@ near_to_far_ind = np.argsort(distance_km)[0:14]
 # Every 4th (14)
 # near_to_far_ind = np.argsort(distance_km)[:-9:4]
 
-do_n_counties = 14
-
 M = np.transpose(sub_cases[near_to_far_ind, :])
 C = sub_counties[near_to_far_ind]
 D = distance_km[near_to_far_ind]
 
-G = np.diff(M, axis=0)
-index = np.arange(0, G.shape[0]) + 1
-
-win_len = 7
-win = signal.hann(win_len)
-
-temp_win = np.zeros((win_len,))
-temp_win[3] = 1
-index_of_filt_G = signal.convolve(index, temp_win, mode='valid')
-
-filt_G = np.zeros((index_of_filt_G.shape[0], do_n_counties))
-for i in range(G.shape[1]):
-    filt_G[:, i] = signal.convolve(G[:, i], win, mode='valid') / sum(win)
+day = np.arange(M.shape[0])
 
-xlim_global = [min(index_of_filt_G), max(index_of_filt_G)]
+# Daily new cases (diff), smoothed over a week with a Hann window (smooth).
+#   Each day is placed at the middle of its week.
 y_range_type = "zero_to_max"
-y_value_label = "Confirmed cases"
+label_colorbar = "Confirmed cases"
 
 # Make figure.
-fig = firecracker_time_series(filt_G, time=index_of_filt_G,
-                              y_value_label=y_value_label, events=None,
-                              xlim_global=xlim_global, verticals=None,
-                              y_range_type=y_range_type, y_scale="log",
-                              conditions=list(C))
+fig = firecracker(M, time=day, label_colorbar=label_colorbar, diff=1,
+                  smooth=7, y_range_type=y_range_type, y_scale="log",
+                  labels_series=list(C))
 
 # Label x axis.
 xl_txt = "Day since first case in New York state"
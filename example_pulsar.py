@@ -1,28 +1,14 @@
-import numpy as np
 import matplotlib.pyplot as plt
 from firecracker import firecracker
+from firecracker.io import load_long
+from firecracker.preprocess import estimate_period, fold
 
-import csv
-
-# Load a long time series of radio intensities
-total_samples = 24000
-ms = np.empty((total_samples,))         # milliseconds
-intensity = np.empty((total_samples,))  # radio intensity
-with open('data/pulsar_readable.csv') as csv_file:
-    csv_reader = csv.reader(csv_file, delimiter=',')
-    headers = next(csv_reader)
-    line_count = 0
-    for row in csv_reader:
-        ms[line_count] = float(list(row)[0])
-        intensity[line_count] = float(list(row)[1])
-        line_count += 1
-
-# Break this down into apparent periods (epochs)
-ne = 80                         # number of epochs
-nf = int(total_samples / ne)    # samples per epoch
-epochs = intensity.reshape((ne, nf))
-epochs = np.transpose(epochs)
-ms_epoch = ms[0:nf]
+# Load a long time series of radio intensities,
+#   and break it down into periods of the pulsar (epochs).
+intensity, ms = load_long('data/pulsar_readable.csv', number_series=1)
+dt = (ms[-1] - ms[0]) / (len(ms) - 1)  # sampling interval, milliseconds
+period = estimate_period(intensity[:, 0], dt)
+epochs, ms_epoch = fold(intensity[:, 0], period, dt)
 
 
 # Firecracker figure.
@@ -1,5 +1,5 @@
 import numpy as np
-import csv
+from firecracker.io import load_wide
 
 nf = 300  # time frames
 ns = 80   # series, pulsar number
@@ -8,13 +8,9 @@ total_sec = 107
 total_ms = total_sec * 1000
 ms = np.linspace(0, total_ms, nf * ns)
 
-pulsars = np.empty((ns, nf))
-with open('pulsar.csv') as csv_file:
-    csv_reader = csv.reader(csv_file, delimiter=',')
-    line_count = 0
-    for row in csv_reader:
-        pulsars[line_count, :] = np.array([float(v) for v in list(row)])
-        line_count += 1
+# One pulsar per row, one time frame per column.
+frames, _ = load_wide('pulsar.csv')
+pulsars = frames.T
 
 pulsars = pulsars.reshape((-1, ))
 
@@ -0,0 +1,52 @@
+""" firecracker: stacked time series with color gradients.
+
+firecracker() makes the figure, FirecrackerPlot keeps it for streaming
+updates, firecracker_many() makes many figures in parallel, RenderCache
+keeps figures that are asked for again, save_figure() saves a figure within
+a file size, animate() writes a video of a window sliding along a
+recording, export_geometry() writes what a figure would draw for drawing
+elsewhere (e.g. a browser), firecracker.io loads the bundled data formats,
+firecracker.preprocess cuts recordings into epochs and Profile records the
+time each stage of a figure takes.
+
+The data preparation modules, firecracker.decimation, firecracker.limits,
+firecracker.colors, firecracker.preprocess and firecracker.quantiles, need
+numpy only. Everything is imported when first used, so that importing the
+package, or the data preparation alone, does not import matplotlib."""
+
+import importlib
+
+# Where each public name is defined, imported on first use (PEP 562).
+_LAZY = {
+    "firecracker": ".core",
+    "FirecrackerPlot": ".core",
+    "firecracker_many": ".batch",
+    "Profile": ".profiling",
+    "RenderCache": ".cache",
+    "save_figure": ".output",
+    "animate": ".animation",
+    "export_geometry": ".export",
+}
+_SUBMODULES = ("animation", "batch", "cache", "colors", "core",
+               "decimation", "export", "io", "limits", "output",
+               "preprocess", "profiling", "quantiles")
+
+__all__ = ["firecracker", "FirecrackerPlot", "firecracker_many",
+           "RenderCache", "save_figure", "animate", "export_geometry",
+           "Profile", "io", "preprocess"]
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module("." + name, __name__)
+    else:
+        raise AttributeError("module %r has no attribute %r"
+                             % (__name__, name))
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY) | set(_SUBMODULES))
@@ -0,0 +1,208 @@
+""" Animations of a firecracker figure sweeping through a long recording.
+
+animate() shows a window of frames sliding along the recording, one video
+frame per step. Calling firecracker() for each would build and draw a new
+figure every time; instead the figure is made once, as a FirecrackerPlot,
+and each step moves the next window into its artists and blits them over
+a cached background of everything else (axes, ticks, colorbar):
+
+    make the figure     once, with the limits of the whole recording, so
+                        that they are the same in every window
+    each step           reduce and color the window, update the artists,
+                        redraw only them
+    each video frame    the pixels of the canvas, streamed to the encoder
+
+Video frames are written as they are drawn, to ffmpeg through a pipe or to
+a sequence of PNG files, so that memory does not grow with the length of
+the video. Only the window on display is read from a memmap.
+
+    >>> report = animate("pulsar.mp4", M, time, "Radio intensity",
+    ...                  window=2000, step=50, fps=30)
+    >>> report['frames'], report['frames_per_second']
+"""
+
+import os
+import shutil
+import subprocess
+import time as _time
+
+import numpy as np
+
+# Extensions written by ffmpeg, and its options for each beyond the input.
+_FFMPEG_OPTIONS = {
+    "mp4": ["-vcodec", "libx264", "-pix_fmt", "yuv420p"],
+    "mov": ["-vcodec", "libx264", "-pix_fmt", "yuv420p"],
+    "mkv": ["-vcodec", "libx264", "-pix_fmt", "yuv420p"],
+    "webm": ["-vcodec", "libvpx-vp9", "-pix_fmt", "yuv420p"],
+    "gif": [],
+}
+# yuv420p needs an even width and height.
+_EVEN = "pad=ceil(iw/2)*2:ceil(ih/2)*2"
+
+
+# Main function
+def animate(fname, M, time, label_colorbar, window, step=None, fps=30,
+            dpi=None, clock="{:.2f}", **kwargs):
+    """Write a video of a window of frames sliding along a recording.
+
+    Parameters
+    ----------
+    fname : str or callable
+        where the video frames go:
+            path of a video ("mp4", "mov", "mkv", "webm" or "gif"),
+                encoded by ffmpeg (matplotlib's animation.ffmpeg_path)
+            path with a format field, e.g. "frames/{:05d}.png": one PNG
+                per video frame, numbered from 0
+            callable: called with each video frame, an array of height x
+                width x 4 uint8 (RGBA) that is only valid during the call
+    M : numpy.ndarray, numpy.memmap or str
+        2d matrix of time-series data: Time x series, or a file (see
+        firecracker())
+    time : numpy.ndarray
+        1d time values
+    label_colorbar : str
+        as for firecracker()
+    window : int
+        number of frames on display
+    step : int
+        frames the window moves between video frames. Defaults to a tenth
+        of window.
+    fps : float
+        video frames per second
+    dpi : float
+        resolution of the video frames. Defaults to that of the figure.
+    clock : str
+        format of the time at the start of each window, shown at the top
+        left, or None for no clock.
+    **kwargs
+        any other keyword argument of firecracker(). The x axis is the
+        time within the window, from 0, and so are times_markers and
+        times_vert_lines. smooth and diff are applied to the whole
+        recording first.
+
+    Returns
+    -------
+    report : dict
+        "frames": number of video frames
+        "seconds": time to make and write them
+        "frames_per_second": video frames made per second
+        or None when the input is not valid.
+    """
+    from .core import FirecrackerPlot
+    from .decimation import open_data
+    from .limits import data_stats
+    from .preprocess import filter_frames
+
+    start = _time.perf_counter()
+    M = open_data(M, kwargs.pop('data_layout', None))
+    time = np.asarray(time)
+    smooth = kwargs.pop('smooth', None)
+    diff = kwargs.pop('diff', 0)
+    if smooth is not None or diff:
+        M, time = filter_frames(M, time, smooth, diff)
+        if M is None:
+            return None
+    number_frames = M.shape[0]
+    if step is None:
+        step = max(window // 10, 1)
+    assert isinstance(window, int) and window > 1, \
+        'window should be an int of at least 2 frames'
+    assert isinstance(step, int) and step > 0, 'step should be a positive int'
+    if window > number_frames:
+        print("The window is longer than the recording.")
+        return None
+
+    # The limits of the whole recording, in one pass, keep the axes and
+    #   colorbar of every window the same: only the data is redrawn.
+    percentile_error = None
+    if kwargs.get('y_range_type') == "percentile":
+        percentile_error = kwargs.get('percentile_error', 0.001)
+    stats = data_stats(M, percentile_error)
+    kwargs['xlim_global'] = [0, time[window - 1] - time[0]]
+    # Each window is reduced as it is shown: nothing is zoomed.
+    plot = FirecrackerPlot(M[:window], time[:window] - time[0],
+                           label_colorbar, blit=True, stats=stats,
+                           **dict(kwargs, pyplot=False, zoom_detail=False))
+    fig = plot.fig
+    if dpi is not None:
+        fig.set_dpi(dpi)
+    if clock is not None:
+        text = fig.text(0.01, 0.99, "", ha='left', va='top',
+                        fontsize=plot.args['font_size'])
+        plot.args['artists']['overlays'] = [text]
+
+    canvas = fig.canvas
+    width, height = canvas.get_width_height(physical=True)
+    sink = _sink(fname, width, height, fps)
+    if sink is None:
+        return None
+    write, close = sink
+
+    starts = range(0, number_frames - window + 1, step)
+    try:
+        for first in starts:
+            if clock is not None:
+                text.set_text(clock.format(time[first]))
+            plot.update(M[first:first + window],
+                        time[first:first + window] - time[first])
+            write(np.asarray(canvas.buffer_rgba()))
+    finally:
+        close()
+    seconds = _time.perf_counter() - start
+    return {'frames': len(starts), 'seconds': seconds,
+            'frames_per_second': len(starts) / seconds}
+
+
+# Helper functions: where video frames go.
+def _sink(fname, width, height, fps):
+    """(write, close) functions for the video frames of fname (see
+    animate()), or None when fname cannot be written."""
+    if callable(fname):
+        return fname, lambda: None
+    if "{" in fname:
+        return _png_sink(fname)
+    extension = os.path.splitext(fname)[1][1:].lower()
+    if extension not in _FFMPEG_OPTIONS:
+        print("Unknown video format: " + extension)
+        return None
+    return _ffmpeg_sink(fname, extension, width, height, fps)
+
+
+def _png_sink(pattern):
+    """One PNG per video frame, at pattern.format(number)."""
+    import matplotlib.image as mpimg
+
+    count = [0]
+
+    def write(rgba):
+        mpimg.imsave(pattern.format(count[0]), rgba)
+        count[0] += 1
+    return write, lambda: None
+
+
+def _ffmpeg_sink(fname, extension, width, height, fps):
+    """Raw RGBA video frames piped to ffmpeg, which encodes them as they
+    come."""
+    import matplotlib as mpl
+
+    ffmpeg = shutil.which(mpl.rcParams['animation.ffmpeg_path'])
+    if ffmpeg is None:
+        print("ffmpeg was not found: set matplotlib's animation.ffmpeg_path,"
+              " or write PNG frames instead.")
+        return None
+    command = [ffmpeg, "-y", "-loglevel", "error",
+               "-f", "rawvideo", "-pix_fmt", "rgba",
+               "-s", "{}x{}".format(width, height), "-r", str(fps),
+               "-i", "pipe:"]
+    if _FFMPEG_OPTIONS[extension]:
+        command += ["-vf", _EVEN] + _FFMPEG_OPTIONS[extension]
+    process = subprocess.Popen(command + [fname], stdin=subprocess.PIPE)
+
+    def write(rgba):
+        process.stdin.write(rgba.tobytes())
+
+    def close():
+        process.stdin.close()
+        if process.wait() != 0:
+            print("ffmpeg failed to write " + fname)
+    return write, close
@@ -0,0 +1,189 @@
+""" Render many firecracker figures at once, one per process.
+
+firecracker_many() fans independent firecracker() calls out to a pool of
+worker processes that draw with Agg, without pyplot, and save each figure to
+a file. Large arrays reach the workers through shared memory rather than
+being pickled, so a job costs the workers one copy of its data at most."""
+
+import concurrent.futures
+import contextlib
+import gc
+import io
+import os
+import time
+import traceback
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Arrays at least this large are passed through shared memory.
+_SHARE_BYTES = 2**20
+
+
+# Main function
+def firecracker_many(jobs, out_dir, workers=None, format="png", dpi=None):
+    """Make and save one firecracker figure per job, in parallel.
+
+    Parameters
+    ----------
+    jobs : list of dict
+        keyword arguments of firecracker() for each figure: at least "M",
+        "time" and "label_colorbar". An optional "name" gives the file name
+        (without extension), default figure_0000, figure_0001 ...
+        M may be a file path with "data_layout": then each worker reads
+        its own frames and nothing is copied.
+    out_dir : str
+        directory for the figures. Created if need be.
+    workers : int
+        number of worker processes. Defaults to the number of CPUs.
+    format : str
+        file format for savefig, e.g. "png", "svg" or "pdf"
+    dpi : float
+        resolution for savefig. Defaults to matplotlib's savefig.dpi.
+
+    Returns
+    -------
+    results : list of dict
+        one per job, in the order of jobs:
+            "name": name of the figure
+            "path": file written, None when the job failed
+            "seconds": time to make and save the figure
+            "error": None, or what went wrong (message or traceback)
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    results = [None] * len(jobs)
+    pending = {}
+    shared = {}
+    names = {}
+    todo = iter(enumerate(jobs))
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers) as pool:
+            # Keep a couple of jobs per worker in flight, so that only
+            #   their data sits in shared memory at any one time.
+            while True:
+                while len(pending) < 2 * workers:
+                    index, job = next(todo, (None, None))
+                    if job is None:
+                        break
+                    job = dict(job)
+                    name = names[index] = job.pop('name',
+                                                  "figure_%04d" % index)
+                    path = os.path.join(out_dir, name + "." + format)
+                    blocks, job = _share(job)
+                    shared[index] = blocks
+                    try:
+                        future = pool.submit(_run_job, job, name, path,
+                                             format, dpi)
+                    except Exception:
+                        # A worker died and took the pool with it: the
+                        #   jobs left fail rather than the batch.
+                        _unlink(shared.pop(index))
+                        results[index] = _failed(name)
+                        continue
+                    pending[future] = index
+                if not pending:
+                    break
+                done, _ = concurrent.futures.wait(
+                    pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    _unlink(shared.pop(index))
+                    try:
+                        results[index] = future.result()
+                    except Exception:
+                        results[index] = _failed(names[index])
+    finally:
+        for blocks in shared.values():
+            _unlink(blocks)
+    return results
+
+
+# Helpers: run in the parent
+def _share(job):
+    """Blocks of shared memory holding the large arrays of job, and job
+    with those arrays replaced by descriptions of where to find them."""
+    blocks = []
+    described = {}
+    for key, value in job.items():
+        if (isinstance(value, np.ndarray) and not value.dtype.hasobject and
+                value.nbytes >= _SHARE_BYTES):
+            order = 'F' if value.flags.f_contiguous else 'C'
+            block = shared_memory.SharedMemory(create=True,
+                                               size=value.nbytes)
+            copy = np.ndarray(value.shape, dtype=value.dtype,
+                              buffer=block.buf, order=order)
+            copy[...] = value
+            blocks.append(block)
+            value = _Shared(block.name, value.shape, value.dtype.str, order)
+        described[key] = value
+    return blocks, described
+
+
+def _unlink(blocks):
+    """Free blocks of shared memory."""
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+
+def _failed(name):
+    """Result entry of a job whose worker did not return one (e.g. it was
+    killed), with the exception being handled as its error."""
+    return {'name': name, 'path': None, 'seconds': None,
+            'error': traceback.format_exc()}
+
+
+class _Shared:
+    """Where a worker finds an array in shared memory."""
+
+    def __init__(self, name, shape, dtype, order):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+        self.order = order
+
+
+# Helpers: run in the workers
+def _run_job(job, name, path, format, dpi):
+    """Make and save one figure. Returns the result entry of the job."""
+    from .core import firecracker
+
+    result = {'name': name, 'path': None, 'seconds': None, 'error': None}
+    blocks = []
+    fig = None
+    start = time.perf_counter()
+    try:
+        for key, value in job.items():
+            if isinstance(value, _Shared):
+                # Workers share the parent's resource tracker, which
+                #   unlinks the block should the parent die first.
+                block = shared_memory.SharedMemory(name=value.name)
+                blocks.append(block)
+                job[key] = np.ndarray(value.shape, dtype=value.dtype,
+                                      buffer=block.buf, order=value.order)
+        # firecracker() reports invalid input by printing a message.
+        printed = io.StringIO()
+        with contextlib.redirect_stdout(printed):
+            fig = firecracker(**dict(job, pyplot=False))
+        if fig is None:
+            result['error'] = printed.getvalue().strip() or "Invalid input"
+        else:
+            fig.savefig(path, format=format, dpi=dpi, bbox_inches='tight')
+            result['path'] = path
+    except Exception:
+        result['error'] = traceback.format_exc()
+    finally:
+        # Arrays viewing the blocks must go before the blocks can close.
+        #   Artists may hold views of M, inside the figure's reference cycles.
+        job.clear()
+        fig = None
+        gc.collect()
+        for block in blocks:
+            block.close()
+    result['seconds'] = time.perf_counter() - start
+    return result
+
@@ -0,0 +1,355 @@
+""" Cache of firecracker figures, for when the same figures are asked for
+again and again (e.g. by a dashboard).
+
+A RenderCache sits in front of firecracker(): it keys each request on a
+hash of the data and of every keyword argument, and keeps what was made
+for it, either the saved figure (PNG, SVG or PDF bytes) or the prepared data
+that the figure is drawn from. Entries are kept in memory and, optionally,
+in a directory on disk, each tier with its own size limit past which the
+least recently used entries are dropped.
+
+    >>> cache = RenderCache(directory="figure_cache")
+    >>> png = cache.savefig(M, time, "Voltage", layers=True)
+    >>> cache.stats()['hits']
+"""
+
+import collections
+import hashlib
+import io
+import mmap
+import os
+import pickle
+import threading
+
+import numpy as np
+
+from .decimation import _chunks
+
+# Changed whenever what is cached for the same key changes.
+_KEY_VERSION = 4
+
+
+# Main class
+class RenderCache:
+    """Saved figures and prepared data, keyed on the input of firecracker().
+
+    Parameters
+    ----------
+    max_bytes : int
+        size of the memory tier. Least recently used entries are dropped
+        to stay under it.
+    directory : str
+        directory of the disk tier, created if need be. None (default):
+        memory only. Entries are pickled, so only use a directory that no
+        one else can write to.
+    max_disk_bytes : int
+        size of the disk tier.
+
+    Notes
+    -----
+    Arrays are hashed whole (BLAKE2b, a chunk at a time), memmaps and file
+    paths by file name, size and modification time. The hash of a large
+    array costs a small fraction of drawing it, but so much data should not
+    be changed in place between calls and expected to miss.
+
+    Safe to use from several threads. Two threads that miss on the same key
+    at once both make the figure.
+    """
+
+    def __init__(self, max_bytes=256 * 2**20, directory=None,
+                 max_disk_bytes=2**30):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self._memory = collections.OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._counts = collections.Counter()
+
+    def savefig(self, M, time, label_colorbar, format="png", dpi=None,
+                **kwargs):
+        """Bytes of the figure firecracker() makes, saved as format.
+
+        Parameters are those of firecracker() plus format and dpi, as for
+        firecracker_many(). Returns None when the input is not valid.
+        """
+        kwargs = dict(kwargs, label_colorbar=label_colorbar)
+        key = _key(M, time, kwargs, ("savefig", format, dpi))
+
+        def make():
+            from .core import firecracker
+            fig = firecracker(M, time, **dict(kwargs, pyplot=False))
+            if fig is None:
+                return None
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format=format, dpi=dpi, bbox_inches='tight')
+            return buffer.getvalue()
+        return self._get(key, format, make)
+
+    def prepare(self, M, time, **kwargs):
+        """Prepared data of firecracker(): the frames after decimation and
+        upsampling, their colors, limits and layout.
+
+        Parameters are those of firecracker() but label_colorbar. Returns
+        None when the input is not valid. The bundle is shared by every
+        caller, so it must not be changed; firecracker() below draws
+        from a copy.
+        """
+        key = _key(M, time, kwargs, ("prepare",))
+
+        def make():
+            from .core import _prepare
+            args = _prepare(M, time, **dict(kwargs, profile=None))
+            if args is not None and isinstance(args['M'], np.memmap):
+                # The frames in view of a file, kept rather than the file.
+                args['M'] = np.array(args['M'])
+            if args is not None:
+                # The full frames are not kept either: figures drawn from
+                #   the cache keep the detail they were drawn with on zoom.
+                args['time_full'] = args['M_full'] = None
+            return args
+        return self._get(key, "bundle", make)
+
+    def firecracker(self, M, time, label_colorbar, **kwargs):
+        """firecracker(), drawn from prepared data when it is cached.
+
+        Each call draws a new figure, so that it can be changed freely.
+        """
+        from .core import _render
+        from .profiling import _as_profile, _stage
+
+        profile = _as_profile(kwargs.pop('profile', None))
+        with _stage(profile, "prepare"):
+            args = self.prepare(M, time, **kwargs)
+        if args is None:
+            return None
+        args = dict(args, profile=profile)
+        with _stage(profile, "render"):
+            return _render(args, label_colorbar)
+
+    def stats(self):
+        """Hit and miss counts and the size of each tier.
+
+        Returns
+        -------
+        dict
+            "hits": requests served from either tier
+            "memory_hits", "disk_hits": requests served from each tier
+            "misses": requests for which the figure was made
+            "memory_evictions", "disk_evictions": entries dropped
+            "memory_entries", "memory_bytes": contents of the memory tier
+            "disk_entries", "disk_bytes": contents of the disk tier
+        """
+        with self._lock:
+            stats = {name: self._counts[name] for name in (
+                'memory_hits', 'disk_hits', 'misses', 'memory_evictions',
+                'disk_evictions')}
+            stats['hits'] = stats['memory_hits'] + stats['disk_hits']
+            stats['memory_entries'] = len(self._memory)
+            stats['memory_bytes'] = self._memory_bytes
+        files = self._disk_files()
+        stats['disk_entries'] = len(files)
+        stats['disk_bytes'] = sum(f.stat().st_size for f in files)
+        return stats
+
+    def clear(self):
+        """Drop every entry of both tiers. Counts are kept."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        for f in self._disk_files():
+            _remove(f.path)
+
+    # Helpers: the tiers
+    def _get(self, key, kind, make):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._counts['memory_hits'] += 1
+                return self._memory[key][0]
+
+        value = self._read_disk(key, kind)
+        if value is not None:
+            with self._lock:
+                self._counts['disk_hits'] += 1
+            self._keep(key, value)
+            return value
+
+        with self._lock:
+            self._counts['misses'] += 1
+        value = make()
+        if value is not None:
+            self._keep(key, value)
+            self._write_disk(key, kind, value)
+        return value
+
+    def _keep(self, key, value):
+        """Add value to the memory tier, dropping the least recently used
+        entries to make room."""
+        size = _size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._memory:
+                self._memory_bytes -= self._memory.pop(key)[1]
+            self._memory[key] = (value, size)
+            self._memory_bytes += size
+            while self._memory_bytes > self.max_bytes:
+                _, (_, dropped) = self._memory.popitem(last=False)
+                self._memory_bytes -= dropped
+                self._counts['memory_evictions'] += 1
+
+    def _path(self, key, kind):
+        return os.path.join(self.directory, key + "." + kind)
+
+    def _read_disk(self, key, kind):
+        if self.directory is None:
+            return None
+        path = self._path(key, kind)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # The modification time records the last use, for eviction.
+            os.utime(path)
+        except OSError:
+            return None
+        if kind == "bundle":
+            return pickle.loads(data)
+        return data
+
+    def _write_disk(self, key, kind, value):
+        if self.directory is None:
+            return
+        data = value
+        if kind == "bundle":
+            data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.max_disk_bytes:
+            return
+        # Written under a temporary name first, so that a reader running at
+        #   the same time never finds half an entry.
+        path = self._path(key, kind)
+        partial = path + ".%d.%d.partial" % (os.getpid(),
+                                             threading.get_ident())
+        try:
+            with open(partial, 'wb') as f:
+                f.write(data)
+            os.replace(partial, path)
+        except OSError:
+            # Full or read-only disk: keep going with the memory tier.
+            _remove(partial)
+            return
+        self._evict_disk()
+
+    def _evict_disk(self):
+        """Drop the least recently used files beyond max_disk_bytes."""
+        files = [(f.stat().st_mtime_ns, f.stat().st_size, f.path)
+                 for f in self._disk_files()]
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            if _remove(path):
+                with self._lock:
+                    self._counts['disk_evictions'] += 1
+            total -= size
+
+    def _disk_files(self):
+        if self.directory is None:
+            return []
+        try:
+            return [f for f in os.scandir(self.directory)
+                    if f.is_file() and not f.name.endswith(".partial")]
+        except OSError:
+            return []
+
+
+# Helper functions: keys and sizes
+def _key(M, time, kwargs, what):
+    """Hex digest identifying a request: data, keyword arguments (but
+    profile, which does not change the figure) and what is made of them."""
+    import matplotlib
+
+    h = hashlib.blake2b(digest_size=20)
+    _digest(h, (_KEY_VERSION, matplotlib.__version__, what))
+    if isinstance(M, (str, os.PathLike)):
+        # A file of data, by name, size and modification time.
+        stat = os.stat(M)
+        M = ("file", os.path.abspath(M), stat.st_size, stat.st_mtime_ns)
+    _digest(h, M)
+    _digest(h, time)
+    for name in sorted(kwargs):
+        if name != 'profile':
+            _digest(h, (name, kwargs[name]))
+    return h.hexdigest()
+
+
+def _file_position(value):
+    """Position in its file of the first byte of a memmap, or of a view of
+    one, or None when value is not mapped from a file.
+
+    value.offset is that of the whole mapping: a slice keeps it, so the
+    position of a view is found from how far its data is into the mapping.
+    """
+    if not isinstance(value, np.memmap) or value.filename is None:
+        return None
+    mapping = getattr(value, '_mmap', None)
+    if mapping is None:
+        return None
+    start = np.frombuffer(mapping, dtype=np.uint8).__array_interface__
+    # The mapping starts at offset rounded down to the allocation
+    #   granularity, as np.memmap maps it.
+    first = value.offset - value.offset % mmap.ALLOCATIONGRANULARITY
+    return (first + value.__array_interface__['data'][0] -
+            start['data'][0])
+
+
+def _digest(h, value):
+    """Add value to hash h, arrays by their bytes and the rest by repr."""
+    position = _file_position(value)
+    if position is not None:
+        stat = os.stat(value.filename)
+        h.update(repr(("memmap", value.filename, position, value.shape,
+                       value.strides, value.dtype.str, stat.st_size,
+                       stat.st_mtime_ns)).encode())
+    elif isinstance(value, np.ndarray) and not value.dtype.hasobject:
+        # Series by series arrays are hashed as their transpose, which is
+        #   contiguous, so that neither layout needs a copy.
+        order = "F" if value.flags.f_contiguous and value.ndim > 1 else "C"
+        if order == "F":
+            value = value.T
+        h.update(repr(("array", order, value.dtype.str,
+                       value.shape)).encode())
+        if value.ndim == 0:
+            value = value.reshape(1)
+        for rows in _chunks(value):
+            h.update(np.ascontiguousarray(value[rows]).data)
+    elif isinstance(value, np.ndarray):
+        _digest(h, ("object array", value.shape, value.tolist()))
+    elif isinstance(value, (list, tuple)):
+        h.update(("%s %d(" % (type(value).__name__, len(value))).encode())
+        for item in value:
+            _digest(h, item)
+        h.update(b")")
+    elif isinstance(value, dict):
+        _digest(h, ("dict", sorted(value.items(), key=repr)))
+    else:
+        h.update(repr(value).encode())
+        h.update(b",")
+
+
+def _size(value):
+    """Bytes held by a cached value: saved figure or prepared data."""
+    if isinstance(value, bytes):
+        return len(value)
+    return sum(v.nbytes for v in value.values() if isinstance(v, np.ndarray))
+
+
+def _remove(path):
+    """Remove a file, if it is still there. True when it was removed."""
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        return False
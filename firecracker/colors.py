@@ -0,0 +1,54 @@
+""" Mapping of values to colors, once for all series, as uint8 RGBA (or
+as indices into the colormap, see color_index()).
+
+Only colormap_lut() needs matplotlib, for the colormap itself, and imports
+it when called."""
+
+import numpy as np
+
+
+def color_values(M, y_scale, stats):
+    """Values mapped to color: CM.
+
+    M itself, or log10 of M above its minimum when y_scale is "log".
+    """
+    # If y axis is log scale, then color gradient should also be log scale.
+    if y_scale == "log":
+        eps = np.finfo(float).eps
+        return np.log10(M - stats['min'] + eps)
+    return M
+
+
+def colormap_lut(cmap):
+    """Colormap as a uint8 RGBA lookup table.
+
+    Rounded to 8 bits the way Agg rounds float colors, so that drawing with
+    these colors gives the same pixels as drawing with the colormap.
+    """
+    import matplotlib as mpl
+
+    colormap = mpl.colormaps[cmap]
+    lut = colormap(np.arange(colormap.N))
+    return np.round(lut * 255).astype(np.uint8)
+
+
+def map_colors(value, lut, clim):
+    """uint8 RGBA of each value: Normalize to clim, then the lut.
+
+    Out-of-range values take the end colors and NaN is transparent, as with
+    matplotlib's colormaps.
+    """
+    rgba = lut[color_index(value, lut.shape[0], clim)]
+    rgba[np.isnan(value)] = 0
+    return rgba
+
+
+def color_index(value, N, clim):
+    """Index of the color of each value in a lut of N colors.
+
+    Out-of-range values take the end colors, and NaN the first.
+    """
+    span = (clim[1] - clim[0]) or 1.0
+    with np.errstate(invalid='ignore'):
+        index = (value - clim[0]) / span * N
+        return np.clip(np.nan_to_num(index), 0, N - 1).astype(np.intp)
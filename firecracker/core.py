@@ -0,0 +1,1606 @@
+""" This module contains a function, firecracker, that produces a figure
+of multiple time series that are stacked horizontally. A color gradient is
+applied to each series so that one can use both the height of the y axis and
+color in order to visually compare the shape and relative magnitude of the
+different series.
+
+The class FirecrackerPlot makes the same figure but keeps its artists, so
+that streaming data can be shown by updating them in place."""
+
+# External dependencies
+#   matplotlib.pyplot, which picks a GUI backend, is imported by _subplots()
+#   only for figures made with pyplot.
+import contextlib
+import functools
+
+import numpy as np
+import matplotlib as mpl
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import (LineCollection, PathCollection,
+                                    PolyCollection)
+from matplotlib.figure import Figure
+from matplotlib.ticker import MaxNLocator
+
+from .colors import color_values, colormap_lut, map_colors
+from .decimation import (_MAX_ADAPTIVE, _chunks, _dimensions_match,
+                         auto_buckets, open_data, reduce_frames,
+                         visible_frames)
+from .limits import _layer_shifts, data_limits, data_stats, merge_stats
+from .preprocess import filter_frames
+from .profiling import (_add_tallies, _as_profile, _stage, _tallies,
+                        _watch)
+
+# single_axes="auto" stacks panels on one Axes from this many series.
+_SINGLE_AXES_SERIES = 50
+# Bytes held per point drawn, from firecracker() to the first draw: M,
+#   colors and matplotlib's copies of both (a Path per segment for
+#   gradient "line"). Measured with tracemalloc; the raster backend keeps
+#   little more than M. Used for memory_budget.
+_POINT_BYTES = {"scatter": 128, "line": 640, "raster": 32}
+
+
+# Main function
+def firecracker(M, time, label_colorbar, labels_series=None,
+                times_markers=None, times_vert_lines=[], xlim_global=None,
+                y_range_type="min_to_max", y_scale="linear", layers=False,
+                upsample=1, gradient="scatter", decimate=None,
+                backend="matplotlib", data_layout=None, pyplot=True,
+                profile=None, smooth=None, diff=0, single_axes="auto",
+                zoom_detail=True, rasterize=False, memory_budget=None,
+                percentiles=(1, 99), percentile_error=0.001):
+    """
+
+    Make a 'firecracker' time series:
+    a colorful figure of multiple time series.
+
+    Time series are stacked horizontally.
+    A color gradient is applied to each series so that an observer can use both
+    the height of the y axis and color in order to visually compare the shape
+    and relative magnitude of the different series.
+
+    Parameters
+    ----------
+    M : numpy.ndarray, numpy.memmap or str
+        2d matrix of time-series data: Time x series.
+        Or the path of a binary file of such data, described by data_layout.
+        Files and memmaps are read in chunks: only the frames within
+        xlim_global are kept, decimated ("auto" unless decimate is given).
+    time : numpy.ndarray
+        1d time values
+    label_colorbar : str
+        label for y-axis values. displayed on colorbar, not on y axis.
+    labels_series : list
+        list of strings to label each series
+    times_markers : list
+        list of times to mark a specific event in each series
+    times_vert_lines : scalar or list
+        x-axis value(s) for vertical line(s) spanning all series
+    xlim_global : list
+        x-axis limits (for all series). Defaults to the range of time.
+    y_range_type : str
+        method for setting y-axis range
+            "min_to_max", "symmetric_around_zero", "zero_to_max",
+            "percentile": as "min_to_max", between percentiles rather than
+                the minimum and maximum, for both the y axes and colors,
+                so that a few spikes (artifacts) do not squash the rest.
+    y_scale : str
+        type of y axis: "linear" or "log"
+    layers : bool
+        from top to bottom, series are 'occluded' by subsequent series.
+    upsample : int or "adaptive"
+        interpolate to increase number of samples: upsample x original number.
+        "adaptive": add samples only between frames where the points of
+            some series would be drawn too far apart to look like a line,
+            as many as needed (up to 16) to close the gap.
+    gradient : str
+        how the color gradient is drawn:
+            "scatter" (one marker per sample) or
+            "line" (one LineCollection of colored segments per series).
+        "line" draws a continuous gradient, so upsample is rarely needed.
+    decimate : None, "auto" or int
+        reduce each series to the minimum and maximum within each of a
+        number of buckets of (nearly) equal numbers of frames, keeping
+        peaks visible.
+            "auto": one bucket per horizontal pixel of the figure.
+            int: number of buckets.
+        Decimation is applied before upsample. The y-axis and color
+        ranges are computed from all frames, before either.
+    backend : str
+        "matplotlib": one artist per series (or per sample, for scatter).
+        "raster": series are drawn straight into an RGBA image that is
+        shown with a single imshow, so drawing time depends on the number
+        of pixels rather than on series x samples. Intended for overviews
+        of thousands of series. Uses numba when it is installed.
+    data_layout : dict
+        layout of the file when M is a path:
+            "number_series": number of series (required)
+            "dtype": data type of each value, default "float64"
+            "order": "C" (frame by frame) or "F" (series by series),
+                default "C"
+            "offset": bytes to skip at the start of the file, default 0
+    pyplot : bool
+        True: the figure is made with pyplot, so that it can be shown and
+            modified through pyplot like any other figure.
+        False: the figure is a matplotlib.figure.Figure with an Agg canvas,
+            unknown to pyplot. Safe to make from several threads at once,
+            and freed like any other object once it is no longer used.
+        Neither changes matplotlib's rcParams.
+    profile : firecracker.Profile or callable
+        record the wall time, memory growth and artist count of each stage
+        of making the figure in this Profile (see firecracker.profiling).
+        A callable is called with the record of each stage as it ends.
+        None (default): nothing is recorded.
+    smooth : int or numpy.ndarray
+        moving average of each series, applied before everything else:
+            int: number of frames of a Hann window
+            1d array: weights of the window
+        Only frames with a full window are kept, and each is placed at the
+        middle of its window (see firecracker.preprocess.smooth).
+    diff : int
+        number of times differences between consecutive frames are taken,
+        before smooth: e.g. 1 shows daily new cases of a cumulative count.
+        Each difference is placed at the time of its later frame.
+        Files and memmaps are read whole when smooth or diff are given.
+    single_axes : bool or "auto"
+        without layers, how the panel of each series is made:
+            False: one Axes per series.
+            True: all series on one Axes, each shifted into a band of its
+                own and clipped to it, which looks the same but costs no
+                Axes per series: much faster for hundreds of series.
+            "auto": True from 50 series.
+        Always False for y_scale "log", whose panels have tick labels of
+        their own and may choose their own lower y limit.
+    zoom_detail : bool
+        with decimate, keep the full frames with the figure, and reduce the
+        frames within the new x limits again whenever an Axes is zoomed or
+        panned: detail grows as you zoom in, while about as many points
+        are drawn. The full frames are those after smooth and diff, and a
+        memmap stays on disk. False keeps the frames reduced at first.
+    rasterize : bool
+        in vector output (SVG, PDF), draw the gradients and fills of the
+        series as images at the dpi of savefig, keeping text, axes,
+        colorbar, event markers and vertical lines as vectors: far smaller
+        files, faster to save and open, for series of many points. See
+        firecracker.output.save_figure() to fit a file size.
+    memory_budget : int
+        most bytes wanted for the points drawn, from reading the frames to
+        the first draw of the figure: when more would be drawn, frames are
+        decimated to as many buckets as fit (upsample counted at its
+        factor, "adaptive" at 16). Neither M nor the fixed cost of the
+        figure (a few MB) are counted. float32 data stays float32
+        throughout, half the memory of float64.
+    percentiles : tuple
+        lower and upper percentile (0 to 100) of all values, for
+        y_range_type "percentile"
+    percentile_error : float
+        how far off those percentiles may be, as a fraction of the number
+        of values (0.001: a tenth of a percentile). They are estimated in
+        the same pass over M as its minimum and maximum, with a streaming
+        sketch of a few thousand values (see firecracker.quantiles),
+        rather than by sorting M.
+
+
+    Returns
+    -------
+    matplotlib.figure.Figure
+        Figure object that can be further modified.
+
+    """
+    profile = _as_profile(profile)
+    with _stage(profile, "prepare"):
+        args = _prepare(M, time, labels_series=labels_series,
+                        times_markers=times_markers,
+                        times_vert_lines=times_vert_lines,
+                        xlim_global=xlim_global, y_range_type=y_range_type,
+                        y_scale=y_scale, layers=layers, upsample=upsample,
+                        gradient=gradient, decimate=decimate,
+                        backend=backend, data_layout=data_layout,
+                        pyplot=pyplot, profile=profile, smooth=smooth,
+                        diff=diff, single_axes=single_axes,
+                        zoom_detail=zoom_detail, rasterize=rasterize,
+                        memory_budget=memory_budget, percentiles=percentiles,
+                        percentile_error=percentile_error)
+    if args is None:
+        return None
+    with _stage(profile, "render"):
+        return _render(args, label_colorbar)
+
+
+# Figure that is updated in place as data comes in.
+class FirecrackerPlot:
+    """
+
+    A firecracker figure that keeps its artists, so that new data is shown
+    by changing them in place instead of building a new figure.
+
+    Parameters
+    ----------
+    M : numpy.ndarray
+        2d matrix of time-series data: Time x series
+    time : numpy.ndarray
+        1d time values
+    label_colorbar : str
+        label for y-axis values. displayed on colorbar, not on y axis.
+    window : int
+        number of most recent frames on display. None keeps all frames.
+    blit : bool
+        when no limits change, redraw only the data by blitting it over a
+        cached background. Needs a canvas that can blit (Agg based).
+    stats : dict
+        data_stats() of all the data that will be shown, e.g. of a whole
+        recording shown a window at a time. The limits are set from it once
+        and kept, instead of grown with each update.
+    **kwargs
+        any other keyword argument of firecracker().
+
+    Attributes
+    ----------
+    fig : matplotlib.figure.Figure
+        Figure object that can be further modified.
+
+    Notes
+    -----
+    Without stats, ylim_global and clim_global are worked out again with
+    each batch of new frames, from the stats of every frame shown so far
+    rather than by rescanning the frames on display. Limits from the
+    minimum and maximum so only grow, even when frames leave the window;
+    those of y_range_type "percentile" follow the percentiles of every
+    frame so far, and can move either way.
+
+    Without xlim_global, the x axis follows the frames on display and
+    every update is a full redraw. Give xlim_global to keep the x axis
+    fixed and let blit redraw only the data.
+
+    """
+    def __init__(self, M, time, label_colorbar, window=None, blit=False,
+                 stats=None, **kwargs):
+        self.window = window
+        self.blit = blit
+        kwargs['stats'] = stats
+        self._follow_x = kwargs.get('xlim_global') is None
+        self._background = None
+        self._time, self._M = self._trim(np.asarray(time), M)
+        profile = kwargs['profile'] = _as_profile(kwargs.get('profile'))
+        with _stage(profile, "prepare"):
+            self.args = _prepare(self._M, self._time, **kwargs)
+        if self.args is None:
+            raise ValueError("Invalid input for FirecrackerPlot.")
+        with _stage(profile, "render"):
+            self.fig = _render(self.args, label_colorbar)
+
+    def update(self, M, time=None):
+        """Show M (frames x series) instead of the data on display."""
+        if time is None:
+            time = self._time
+        time, M = self._trim(np.asarray(time), M)
+        self._set_data(time, M, M.shape[0])
+
+    def append(self, frames, time=None):
+        """Add frames (frames x series) after the data on display.
+
+        Without time, frames follow on at the current sampling interval.
+        """
+        frames = np.reshape(frames, (-1, self._M.shape[1]))
+        if time is None:
+            dt = self._time[-1] - self._time[-2]
+            time = self._time[-1] + dt * np.arange(1, frames.shape[0] + 1)
+        time = np.concatenate((self._time, np.atleast_1d(time)))
+        M = np.concatenate((self._M, frames))
+        time, M = self._trim(time, M)
+        self._set_data(time, M, frames.shape[0])
+
+    def _trim(self, time, M):
+        if self.window is not None:
+            return time[-self.window:], M[-self.window:]
+        return time, M
+
+    def _set_data(self, time, M, number_new):
+        """Show M, of which the last number_new frames are new."""
+        self._time, self._M = time, M
+        with _stage(self.args['profile'], "update"):
+            self._set_data_stages(time, M, number_new)
+
+    def _set_data_stages(self, time, M, number_new):
+        args = self.args
+        profile = args['profile']
+        old_limits = [args['xlim_global'], args['ylim_global'],
+                      args['clim_global'], _view_limits(args)]
+
+        # The frames on display are filtered again as a whole, so that
+        #   windows reach across the frames that came before.
+        if args['smooth'] is not None or args['diff']:
+            with _stage(profile, "filter"):
+                M, time = filter_frames(M, time, args['smooth'],
+                                        args['diff'])
+            if M is None:
+                return
+        if args['M_full'] is not None:
+            args['time_full'], args['M_full'] = time, M
+
+        # Grow the limits with the range of the new frames only, unless
+        #   they were set from the stats of all the data to be shown.
+        if not args['fixed_stats']:
+            with _stage(profile, "stats"):
+                new_stats = data_stats(M[-number_new:],
+                                       args['percentile_error'])
+            with _stage(profile, "limits"):
+                args['stats'] = merge_stats(args['stats'], new_stats)
+                args.update(data_limits(args['stats'], args['y_range_type'],
+                                        args['y_scale'], args['layers'],
+                                        args['percentiles']))
+        with _stage(profile, "limits"):
+            if self._follow_x:
+                args['xlim_global'] = [time.min(), time.max()]
+
+        time, M = _reduce(profile, time, M, args['decimate'],
+                          args['upsample'], args['xlim_global'],
+                          args['ylim_global'], args['layout'])
+        args['time'] = time
+        args['M'] = M
+        with _stage(profile, "color_mapping"):
+            args['RGBA'] = _colors(args)
+        with _stage(profile, "artists"):
+            # The x limits set here are not a zoom: the frames were just
+            #   reduced for them.
+            with contextlib.ExitStack() as stack:
+                for ax in _data_axes(args):
+                    stack.enter_context(
+                        ax.callbacks.blocked(signal='xlim_changed'))
+                _update(args)
+
+        new_limits = [args['xlim_global'], args['ylim_global'],
+                      args['clim_global'], _view_limits(args)]
+        canvas = self.fig.canvas
+        with _stage(profile, "draw"):
+            if (self.blit and new_limits == old_limits and
+                    hasattr(canvas, 'copy_from_bbox')):
+                self._blit()
+            else:
+                self._background = None
+                canvas.draw_idle()
+
+    def _blit(self):
+        """Draw the data artists over a background cached without them."""
+        canvas = self.fig.canvas
+        dynamic = _data_artists(self.args)
+        if self._background is None:
+            visible = [a.get_visible() for a in dynamic]
+            for a in dynamic:
+                a.set_visible(False)
+            canvas.draw()
+            self._background = canvas.copy_from_bbox(self.fig.bbox)
+            for a, v in zip(dynamic, visible):
+                a.set_visible(v)
+        canvas.restore_region(self._background)
+        for a in dynamic:
+            self.fig.draw_artist(a)
+        canvas.blit(self.fig.bbox)
+
+
+# Preparation of data, limits and layout, shared by firecracker() and
+#   FirecrackerPlot: _prepare(), _colors() and _render(). The data itself
+#   is prepared by the decimation, limits and colors modules.
+def _prepare(M, time, labels_series=None, times_markers=None,
+             times_vert_lines=[], xlim_global=None,
+             y_range_type="min_to_max", y_scale="linear", layers=False,
+             upsample=1, gradient="scatter", decimate=None,
+             backend="matplotlib", data_layout=None, pyplot=True,
+             profile=None, smooth=None, diff=0, single_axes="auto",
+             zoom_detail=True, rasterize=False, memory_budget=None,
+             percentiles=(1, 99), percentile_error=0.001, stats=None):
+    """Check the input of firecracker() and work out everything needed to
+    draw it. Returns the args dict used by the helper functions, or None
+    when the input is not valid.
+
+    Each step is recorded as a stage of profile, a Profile or None. stats,
+    the data_stats() of M when already known (e.g. of a whole recording of
+    which M is a window), sets the limits instead of M."""
+    with _stage(profile, "open"):
+        M = open_data(M, data_layout)
+
+    # Shape of data and check consistency.
+    number_frames, number_series = M.shape
+    if not _dimensions_match(M, time, labels_series, times_markers):
+        return None
+
+    # Differences and moving averages, which the rest is worked out from.
+    if smooth is not None or diff:
+        with _stage(profile, "filter"):
+            M, time = filter_frames(M, time, smooth, diff)
+        if M is None:
+            return None
+
+    if (isinstance(times_vert_lines, float) or
+            isinstance(times_vert_lines, int)):
+        times_vert_lines = [times_vert_lines]
+
+    assert isinstance(upsample, int) or upsample == "adaptive", \
+        'upsample should be int or "adaptive"'
+    assert gradient in ("scatter", "line"), \
+        'gradient should be "scatter" or "line"'
+    assert (decimate is None or decimate == "auto" or
+            (isinstance(decimate, int) and decimate > 0)), \
+        'decimate should be None, "auto" or a positive int'
+    assert backend in ("matplotlib", "raster"), \
+        'backend should be "matplotlib" or "raster"'
+    assert single_axes in (True, False, "auto"), \
+        'single_axes should be True, False or "auto"'
+    assert memory_budget is None or memory_budget > 0, \
+        'memory_budget should be a positive number of bytes'
+    assert 0 <= percentiles[0] < percentiles[1] <= 100, \
+        'percentiles should be increasing, from 0 to 100'
+
+    if xlim_global is None:
+        xlim_global = [time.min(), time.max()]
+
+    # Display parameters.
+    FontSize = 12
+
+    # Figure size, axes geometry and x ticks, planned before any drawing.
+    with _stage(profile, "layout"):
+        layout = _plan_layout(number_series, xlim_global, layers, FontSize)
+
+    # Common scales for color gradients and y axes, from every frame as
+    #   given, in one pass, before decimation and upsampling. Min/max
+    #   decimation keeps the minimum and maximum; upsampled frames need
+    #   not, as the new time grid can fall either side of a peak, and
+    #   their percentiles weigh the frames differently. Limits therefore
+    #   span the data itself rather than what is drawn of it.
+    #   Percentiles come from a sketch filled in the same pass.
+    if y_range_type != "percentile":
+        percentile_error = None
+    fixed_stats = stats is not None
+    if stats is None:
+        with _stage(profile, "stats"):
+            stats = data_stats(M, percentile_error)
+    with _stage(profile, "limits"):
+        limits = data_limits(stats, y_range_type, y_scale, layers,
+                             percentiles)
+    if limits is None:
+        print("Invalid value for y_range_type.")
+        return None
+
+    # Bands of one Axes need the y limits and ticks of the panels. Log
+    #   panels keep minor tick labels, and matplotlib drops a lower limit
+    #   that is not positive from a log axis, letting each panel find its
+    #   own.
+    if single_axes == "auto":
+        single_axes = number_series >= _SINGLE_AXES_SERIES
+    if y_scale == "log":
+        single_axes = False
+
+    # Out of core: only the frames in view, decimated, are read into memory.
+    #   The full frames are kept to be reduced again on zoom, see _zoom().
+    if isinstance(M, np.memmap) and decimate is None:
+        decimate = "auto"
+    if memory_budget is not None:
+        decimate = _budget_decimate(time, decimate, upsample, xlim_global,
+                                    layout, number_series, memory_budget,
+                                    "raster" if backend == "raster"
+                                    else gradient)
+    time_full, M_full = None, None
+    if zoom_detail and decimate is not None:
+        time_full, M_full = time, M
+    if isinstance(M, np.memmap):
+        with _stage(profile, "read"):
+            time, M = visible_frames(time, M, xlim_global)
+
+    time, M = _reduce(profile, time, M, decimate, upsample, xlim_global,
+                      limits['ylim_global'], layout)
+
+    args = {}
+    args['number_series'] = number_series
+    args['time'] = time
+    args['M'] = M
+    args['cmap'] = limits['cmap']
+    args['lut'] = colormap_lut(limits['cmap'])
+    args['clim_global'] = limits['clim_global']
+    args['y_scale'] = y_scale
+    args['xlim_global'] = xlim_global
+    args['ylim_global'] = limits['ylim_global']
+    args['times_markers'] = times_markers
+    args['event_color'] = limits['event_color']
+    args['labels_series'] = labels_series
+    args['times_vert_lines'] = times_vert_lines
+    args['gradient'] = gradient
+    args['layout'] = layout
+    args['layers'] = layers
+    args['backend'] = backend
+    args['font_size'] = FontSize
+    args['y_range_type'] = y_range_type
+    args['percentiles'] = percentiles
+    args['percentile_error'] = percentile_error
+    args['decimate'] = decimate
+    args['upsample'] = upsample
+    args['stats'] = stats
+    args['fixed_stats'] = fixed_stats
+    args['pyplot'] = pyplot
+    args['profile'] = profile
+    args['smooth'] = smooth
+    args['diff'] = diff
+    args['single_axes'] = single_axes
+    args['time_full'] = time_full
+    args['M_full'] = M_full
+    args['rasterize'] = rasterize
+    with _stage(profile, "color_mapping"):
+        args['RGBA'] = _colors(args)
+    return args
+
+
+def _budget_decimate(time, decimate, upsample, xlim_global, layout,
+                     number_series, memory_budget, kind):
+    """decimate, or a number of buckets few enough for the points drawn
+    to fit in memory_budget bytes. kind is a key of _POINT_BYTES."""
+    factor = upsample if isinstance(upsample, int) else _MAX_ADAPTIVE
+    max_frames = memory_budget // (_POINT_BYTES[kind] * number_series *
+                                   max(factor, 1))
+    start, stop = np.searchsorted(time, xlim_global)
+    number_frames = stop - start
+    if decimate == "auto":
+        number_frames = min(2 * auto_buckets(time, xlim_global,
+                                             layout['axes_width_inches'],
+                                             layout['dpi']), number_frames)
+    elif decimate is not None:
+        number_frames = min(2 * decimate, number_frames)
+    if number_frames <= max_frames:
+        return decimate
+    return int(max(max_frames // 2, 1))
+
+
+def _reduce(profile, time, M, decimate, upsample, xlim_global, ylim_global,
+            layout):
+    """reduce_frames(), with decimation and upsampling as separate stages
+    of profile."""
+    with _stage(profile, "decimate"):
+        time, M = reduce_frames(time, M, decimate, 1, xlim_global,
+                                ylim_global, layout)
+    with _stage(profile, "upsample"):
+        return reduce_frames(time, M, None, upsample, xlim_global,
+                             ylim_global, layout)
+
+
+def _colors(args):
+    """Colors of what the matplotlib backend draws, mapped once for all series.
+
+    uint8 RGBA of each point (gradient "scatter") or of each segment
+    between points (gradient "line": the color of the mean of its ends).
+    The artists are given these colors instead of values, so they are not
+    colormapped again when drawn. Mapped a chunk of frames at a time, so
+    that the only array as large as M is the result. The raster backend
+    maps its own pixels with args['lut'] instead.
+    """
+    if args['backend'] == "raster":
+        return None
+    M = args['M']
+    # One more frame per chunk for the ends of the last segment.
+    line = int(args['gradient'] == "line")
+    RGBA = np.empty((M.shape[0] - line,) + M.shape[1:] + (4,),
+                    dtype=np.uint8)
+    # The color values CM are made a chunk at a time, never for all of M.
+    for rows in _chunks(RGBA):
+        CM = color_values(M[rows.start:rows.stop + line], args['y_scale'],
+                          args['stats'])
+        if line:
+            CM = (CM[:-1] + CM[1:]) / 2
+        RGBA[rows] = map_colors(CM, args['lut'], args['clim_global'])
+    return RGBA
+
+
+def _render(args, label_colorbar):
+    """Draw the figure described by args (see _prepare()).
+
+    Font and marker sizes are given to each artist rather than through
+    rcParams, which are shared by every thread.
+    """
+    font_size = args['font_size']
+    args['marker_size'] = args['layout']['marker_size']
+
+    if args['backend'] == "raster":
+        fig, axs = _raster(args)
+    elif args['layers']:
+        fig, axs = _layers(args)
+    elif args['single_axes']:
+        fig, axs = _stacked(args)
+    else:
+        fig, axs = _vanilla(args)
+
+    # Colorbar, from a mappable shared by all series.
+    with _stage(args['profile'], "colorbar"):
+        sp = mpl.cm.ScalarMappable(
+            norm=mpl.colors.Normalize(*args['clim_global']),
+            cmap=args['cmap'])
+        cbar = fig.colorbar(sp, ax=axs, shrink=0.6)
+        cbar.set_label(label_colorbar, fontsize=font_size)
+        cbar.ax.tick_params(which='both', labelsize=font_size)
+
+    # Consecutive rasterized artists are drawn into one image per Axes.
+    if args['rasterize']:
+        artists = args['artists']
+        for artist in artists.get('fills', []) + artists.get('gradients', []):
+            artist.set_rasterized(True)
+
+    args['fig'] = fig
+    args['sp'] = sp
+    args['axs'] = axs
+    if args['M_full'] is not None:
+        for ax in _data_axes(args):
+            ax.callbacks.connect('xlim_changed',
+                                 functools.partial(_zoom, args))
+    return fig
+
+
+# Helper functions: _plan_layout(), _vanilla(), _stacked(), _layers(),
+#   _raster(), _gradient() and the rasterizing functions.
+def _subplots(args, nrows=1):
+    """Figure and axes, made through pyplot or as a bare Agg figure.
+
+    Recorded as stage "axes" of args['profile'].
+    """
+    figsize = args['layout']['figsize']
+    with _stage(args['profile'], "axes"):
+        if args['pyplot']:
+            import matplotlib.pyplot as plt
+            fig, axs = plt.subplots(nrows, 1, figsize=figsize)
+        else:
+            fig = Figure(figsize=figsize)
+            FigureCanvasAgg(fig)
+            axs = fig.subplots(nrows, 1)
+        _watch(args['profile'], fig)
+    return fig, axs
+
+
+def _plan_layout(number_series, xlim_global, layers, font_size):
+    """Figure size, axes geometry, label padding and x ticks.
+
+    Worked out from matplotlib's defaults without making a figure, so that
+    the figure is only built once: subplot parameters from rcParams, the
+    share of the axes width taken by the colorbar, and the x ticks that
+    AutoLocator would choose for an axis of that width.
+    """
+    f_height_inches = 7
+    aspect_ratio = 1.76
+    if number_series > 25:
+        aspect_ratio = 1.2
+    figsize = (f_height_inches * aspect_ratio, f_height_inches)
+
+    # Axes area within the subplot parameters, less the colorbar
+    #   (fig.colorbar takes fraction=0.15 plus pad=0.05 of the width).
+    rc = mpl.rcParams
+    axes_width = (figsize[0] * (1 - 0.15 - 0.05) *
+                  (rc['figure.subplot.right'] - rc['figure.subplot.left']))
+    axes_height = figsize[1] * (rc['figure.subplot.top'] -
+                                rc['figure.subplot.bottom'])
+    panel_height = axes_height
+    if not layers:
+        panel_height = axes_height / number_series
+
+    layout = {}
+    layout['figsize'] = figsize
+    layout['axes_width_inches'] = axes_width
+    layout['axes_height_inches'] = axes_height
+    layout['panel_height_inches'] = panel_height
+    # Span of y beyond ylim_global, from stacking the layers.
+    layout['layer_offset'] = _layer_shifts(number_series)[0] if layers else 0
+    # Marker size in points, which is also the width of gradient lines.
+    nms = 256 / number_series  # 84
+    layout['marker_size'] = max(int(np.log2(nms)), 1)
+    layout['dpi'] = rc['figure.dpi']
+    layout['x_ticks'] = _x_ticks(xlim_global, axes_width, font_size)
+    # Series labels: padding in points (vanilla), x position (layers).
+    layout['label_pad'] = 35
+    layout['label_x'] = _label_x(xlim_global)
+    return layout
+
+
+def _x_ticks(xlim_global, axes_width, font_size):
+    """x ticks that AutoLocator would choose for an axis this wide."""
+    # Tick labels need 3 font sizes each, at most 9 bins.
+    tick_space = int(axes_width * 72 / (font_size * 3))
+    nbins = min(max(tick_space, 1), 9)
+    locator = MaxNLocator(nbins=nbins, steps=[1, 2, 2.5, 5, 10])
+    return locator.tick_values(xlim_global[0], xlim_global[1])
+
+
+def _label_x(xlim_global):
+    """x position of series labels when layered."""
+    xr = xlim_global[1] - xlim_global[0]
+    return xlim_global[0] - 0.22 * xr
+
+
+def _vanilla(args):
+    number_series = args['number_series']
+    time = args['time']
+    M = args['M']
+    RGBA = args['RGBA']
+    y_scale = args['y_scale']
+    xlim_global = args['xlim_global']
+    ylim_global = args['ylim_global']
+    times_markers = args['times_markers']
+    event_color = args['event_color']
+    labels_series = args['labels_series']
+    times_vert_lines = args['times_vert_lines']
+    layout = args['layout']
+
+    # Plot each time series.
+    #   Ensure appropriate ranges.
+    #   Set spines to be invisible except for bottom spine for bottom series.
+    fig, axs = _subplots(args, number_series)
+    fig.subplots_adjust(hspace=0)
+    artists = {'gradients': [], 'markers': [], 'vert_lines': []}
+    names = ("gradients", "markers")
+    gradients, markers = _tallies(args['profile'], *names)
+    for i in range(number_series):
+        with gradients():
+            sp = _gradient(axs[i], time, M[:, i], RGBA[:, i], args)
+        artists['gradients'].append(sp)
+        axs[i].set_yscale(y_scale)
+        if times_markers is not None:
+            with markers():
+                mid_val = M[:, i].mean()
+                if times_markers[i] is not None:
+                    e1 = axs[i].plot(times_markers[i], mid_val, '|', ms=14,
+                                     mew=3, color=event_color)
+                else:
+                    mid_pnt = int(len(time)/2)
+                    e1 = axs[i].plot(time[mid_pnt], mid_val, '|', ms=14,
+                                     mew=3, color=event_color)
+                    eh = e1[0]
+                    eh.set_visible(False)
+            artists['markers'].append(e1[0])
+
+        axs[i].set_xlim(xlim_global[0], xlim_global[1])
+        axs[i].spines['left'].set_visible(False)
+        axs[i].spines['right'].set_visible(False)
+        axs[i].spines['bottom'].set_visible(False)
+        axs[i].spines['top'].set_visible(False)
+        axs[i].set_xticks([])
+        axs[i].set_yticks([])
+        # A log axis keeps labelled minor ticks.
+        axs[i].tick_params(which='both', labelsize=args['font_size'])
+        if labels_series is not None:
+            if labels_series[i] is not None:
+                axs[i].set_ylabel(labels_series[i], rotation=0,
+                                  labelpad=layout['label_pad'],
+                                  fontsize=args['font_size'])
+    _add_tallies(args['profile'], names, (gradients, markers))
+
+    axs[-1].spines['bottom'].set_visible(True)
+    axs[-1].set_xticks(layout['x_ticks'])
+    axs[-1].tick_params(which='both', labelsize=args['font_size'])
+
+    # Ensure y-axis ranges are uniform and stretched out enough to fit data.
+    for ax in axs:
+        ax.set_ylim(ylim_global)
+        ax.set_xlim(xlim_global)
+
+    # Vertical line spanning sub plots.
+    for xv in times_vert_lines:
+        xarange = xlim_global[1] - xlim_global[0]
+        txp = (xv - xlim_global[0]) / xarange
+        artists['vert_lines'] += ax.plot([txp, txp], [0, number_series],
+                                         'k--', transform=ax.transAxes,
+                                         clip_on=False, ms=14, mew=3)
+
+    args['artists'] = artists
+    return fig, axs
+
+
+def _stacked(args):
+    """The figure of _vanilla(), with all series on one Axes.
+
+    Series i is drawn in the band from number_series - 1 - i to
+    number_series - i of the y axis, scaled as ylim_global on a panel of
+    its own would be (see _band_y()), and clipped to the band as it would
+    be to its own Axes.
+    """
+    number_series = args['number_series']
+    time = args['time']
+    M = args['M']
+    RGBA = args['RGBA']
+    xlim_global = args['xlim_global']
+    times_markers = args['times_markers']
+    event_color = args['event_color']
+    times_vert_lines = args['times_vert_lines']
+    layout = args['layout']
+
+    fig, axs = _subplots(args)
+    axs.tick_params(which='both', labelsize=args['font_size'])
+    # Bands span the width of the Axes whatever its x limits.
+    band_transform = mpl.transforms.blended_transform_factory(
+        axs.transAxes, axs.transData)
+    # Limits are set up front, so that adding a series does not scale the
+    #   view to all of them again.
+    axs.set_xlim(xlim_global)
+    axs.set_ylim(0, number_series)
+    axs.set_autoscale_on(False)
+    artists = {'gradients': [], 'markers': [], 'labels': [],
+               'vert_lines': []}
+    names = ("gradients", "markers")
+    gradients, markers = _tallies(args['profile'], *names)
+    bands = number_series - 1 - np.arange(number_series)
+    for i in range(number_series):
+        clip = mpl.patches.Rectangle((0, bands[i]), 1, 1,
+                                     transform=band_transform)
+        with gradients():
+            y = _band_y(M[:, i], bands[i], args)
+            sp = _collection(axs, _gradient_data(time, y, args['gradient']),
+                             RGBA[:, i], args)
+            sp.set_clip_path(clip)
+        artists['gradients'].append(sp)
+        if times_markers is not None:
+            with markers():
+                mid_y = _band_y(M[:, i].mean(), bands[i], args)
+                if times_markers[i] is not None:
+                    e1 = axs.plot(times_markers[i], mid_y, '|', ms=14,
+                                  mew=3, color=event_color)
+                else:
+                    mid_pnt = int(len(time)/2)
+                    e1 = axs.plot(time[mid_pnt], mid_y, '|', ms=14,
+                                  mew=3, color=event_color)
+                    e1[0].set_visible(False)
+                e1[0].set_clip_path(clip)
+            artists['markers'].append(e1[0])
+    _add_tallies(args['profile'], names, (gradients, markers))
+
+    axs.spines['left'].set_visible(False)
+    axs.spines['right'].set_visible(False)
+    axs.spines['top'].set_visible(False)
+    axs.set_yticks([])
+    axs.set_xticks(layout['x_ticks'])
+    axs.set_xlim(xlim_global)
+    if args['labels_series'] is not None:
+        artists['labels'] = _panel_labels(fig, axs, args)
+
+    # Vertical line spanning all series.
+    for xv in times_vert_lines:
+        xarange = xlim_global[1] - xlim_global[0]
+        txp = (xv - xlim_global[0]) / xarange
+        artists['vert_lines'] += axs.plot([txp, txp], [0, number_series],
+                                          'k--', transform=band_transform,
+                                          clip_on=False, ms=14, mew=3)
+
+    args['artists'] = artists
+    return fig, axs
+
+
+def _band_y(y, band, args):
+    """Height on the Axes of _stacked() of the values y of the series drawn
+    in band."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return band + _band_fraction(y, args['ylim_global'], args['y_scale'])
+
+
+def _panel_labels(fig, axs, args):
+    """Series labels of panels stacked on one Axes, each where a rotation=0
+    ylabel of its own panel would be."""
+    number_series = args['number_series']
+    transform = mpl.transforms.offset_copy(
+        axs.get_yaxis_transform(), fig=fig,
+        x=-args['layout']['label_pad'], units='points')
+    label_y = number_series - 0.5 - np.arange(number_series)
+    labels = []
+    for i, label in enumerate(args['labels_series']):
+        if label is not None:
+            labels.append(axs.text(0, label_y[i], s=label,
+                                   transform=transform,
+                                   fontsize=args['font_size'],
+                                   ha='center', va='bottom'))
+    return labels
+
+
+def _layers(args):
+    number_series = args['number_series']
+    time = args['time']
+    M = args['M']
+    RGBA = args['RGBA']
+    times_markers = args['times_markers']
+    event_color = args['event_color']
+    labels_series = args['labels_series']
+    times_vert_lines = args['times_vert_lines']
+    layout = args['layout']
+
+    y_shifts = _layer_shifts(number_series)
+    Y = M + y_shifts
+    bottom_y, top_y = _layer_span(args, Y)
+    fig, axs = _subplots(args)
+    axs.tick_params(which='both', labelsize=args['font_size'])
+    artists = {'gradients': [], 'fills': [], 'labels': [], 'markers': [],
+               'vert_lines': []}
+    # Only what shows of each series is drawn, all series in one
+    #   collection of fills and one of gradients (see _occlusion()).
+    polygons, data, rgba = _occlusion(time, Y, RGBA, args['gradient'],
+                                      bottom_y)
+    with _stage(args['profile'], "fills"):
+        fill = PolyCollection(polygons, color="w")
+        axs.add_collection(fill, autolim=False)
+    with _stage(args['profile'], "gradients"):
+        sp = _collection(axs, data, rgba, args)
+    artists['fills'].append(fill)
+    artists['gradients'].append(sp)
+    args['bottom_y'] = bottom_y
+    _layer_limits(axs, time, bottom_y, top_y)
+    if labels_series is not None:
+        for i, ys in enumerate(y_shifts):
+            if labels_series[i] is not None:
+                artists['labels'].append(
+                    axs.text(layout['label_x'], ys, s=labels_series[i],
+                             fontsize=args['font_size']))
+
+    axs.spines['left'].set_visible(False)
+    axs.spines['right'].set_visible(False)
+    axs.spines['top'].set_visible(False)
+    axs.set_yticks([])
+
+    names = ("markers",)
+    markers, = _tallies(args['profile'], *names)
+    if times_markers is not None:
+        for i, ys in enumerate(y_shifts):
+            with markers():
+                mid_val = M[:, i].mean()
+                if times_markers[i] is not None:
+                    e1 = axs.plot(times_markers[i], mid_val + ys, '|',
+                                  ms=14, mew=3, color=event_color)
+                else:
+                    mid_pnt = int(len(time)/2)
+                    e1 = axs.plot(time[mid_pnt], mid_val + ys, '|',
+                                  ms=14, mew=3, color=event_color)
+                    eh = e1[0]
+                    eh.set_visible(False)
+            artists['markers'].append(e1[0])
+    _add_tallies(args['profile'], names, (markers,))
+
+    # Vertical line spanning sub plots.
+    for xv in times_vert_lines:
+        artists['vert_lines'] += axs.plot([xv, xv], axs.get_ylim(),
+                                          'k--', ms=14, mew=3)
+
+    args['artists'] = artists
+    return fig, axs
+
+
+def _occlusion(time, Y, RGBA, gradient, bottom_y):
+    """What shows of layered series, each drawn over the ones before it
+    with a white fill down to bottom_y.
+
+    A series hides what lies below it of the series before it, so series i
+    shows where it is above the highest of the series after it. Only the
+    band between the two is filled, and only what is above it of the
+    gradient is kept: for "line", segments are cut where they pass under.
+    Listed series by series, drawn this way the fills and gradients look
+    as they would drawn in turn, without overdraw, except where series
+    cross: a scatter marker is kept whole when its centre shows, over the
+    fills of later series that used to cover its edge, and dropped when
+    its centre is hidden, even if its edge used to show.
+
+    Parameters
+    ----------
+    time : numpy.ndarray
+        1d time values
+    Y : numpy.ndarray
+        Time x series, shifted by _layer_shifts()
+    RGBA : numpy.ndarray
+        colors of the points or segments of each series (see _colors())
+    gradient : str
+        "scatter" or "line"
+    bottom_y : float
+        bottom of the fill of the last series
+
+    Returns
+    -------
+    polygons : numpy.ndarray
+        series x vertices x 2, a fill polygon per series
+    data : numpy.ndarray
+        points (n x 2) or segments (n x 2 x 2) of the gradients
+    rgba : numpy.ndarray
+        n x 4 uint8 colors of data
+    """
+    number_frames, number_series = Y.shape
+    # Highest of the series after each one; frames missing from a series
+    #   hide nothing.
+    later = np.full_like(Y, -np.inf, dtype=float)
+    later[:, :-1] = np.fmax.accumulate(Y[:, :0:-1], axis=1)[:, ::-1]
+
+    polygons = np.empty((number_series, 2 * number_frames, 2))
+    polygons[:, :number_frames, 0] = time
+    polygons[:, :number_frames, 1] = Y.T
+    polygons[:, number_frames:, 0] = time[::-1]
+    polygons[:, number_frames:, 1] = np.minimum(
+        Y, np.maximum(later, bottom_y))[::-1].T
+
+    with np.errstate(invalid='ignore'):
+        above = (Y - later).T
+    shows = above > 0
+    points = np.stack((np.broadcast_to(time, shows.shape), Y.T), axis=-1)
+    if gradient != "line":
+        return polygons, points[shows], RGBA.transpose(1, 0, 2)[shows]
+
+    # Segments that show at either end, an end under a later series moved
+    #   to where the segment passes under it.
+    keep = shows[:, :-1] | shows[:, 1:]
+    segments = np.stack((points[:, :-1], points[:, 1:]), axis=2)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        crossing = above[:, :-1] / (above[:, :-1] - above[:, 1:])
+    for end, hidden in ((0, ~shows[:, :-1]), (1, ~shows[:, 1:])):
+        cut = keep & hidden
+        start = segments[:, :, 0][cut]
+        stop = segments[:, :, 1][cut]
+        segments[:, :, end][cut] = (start + crossing[cut][:, np.newaxis] *
+                                    (stop - start))
+    return polygons, segments[keep], RGBA.transpose(1, 0, 2)[keep]
+
+
+def _layer_span(args, Y):
+    """Bottom and top of layered series Y, M shifted by _layer_shifts().
+
+    Those of all the data to be shown when its stats were given (see
+    FirecrackerPlot), so that they stay the same from update to update,
+    else those of Y.
+    """
+    if args['fixed_stats']:
+        y_shifts = _layer_shifts(args['number_series'])
+        return (args['stats']['min'],
+                args['stats']['max'] + y_shifts.max())
+    return args['M'].min(), np.nanmax(Y)
+
+
+def _layer_limits(axs, time, bottom_y, top_y):
+    """Autoscale axs to layered series from bottom_y to top_y, as
+    fill_between() would."""
+    axs.ignore_existing_data_limits = True
+    axs.update_datalim([(time.min(), bottom_y), (time.max(), top_y)])
+    axs.autoscale_view()
+
+
+def _raster(args):
+    number_series = args['number_series']
+    times_markers = args['times_markers']
+    event_color = args['event_color']
+    labels_series = args['labels_series']
+    times_vert_lines = args['times_vert_lines']
+    layout = args['layout']
+    layers = args['layers']
+
+    with _stage(args['profile'], "image"):
+        rgba, xlim, ylim = _raster_image(args)
+
+    fig, axs = _subplots(args)
+    axs.tick_params(which='both', labelsize=args['font_size'])
+    image = axs.imshow(rgba, extent=(xlim[0], xlim[1], ylim[0], ylim[1]),
+                       aspect='auto', interpolation='nearest',
+                       origin='upper')
+    artists = {'image': image, 'labels': [], 'markers': [], 'vert_lines': []}
+
+    axs.spines['left'].set_visible(False)
+    axs.spines['right'].set_visible(False)
+    axs.spines['top'].set_visible(False)
+    axs.set_yticks([])
+    if not layers:
+        axs.set_xticks(layout['x_ticks'])
+    axs.set_xlim(xlim)
+    axs.set_ylim(ylim)
+
+    if labels_series is not None and not layers:
+        artists['labels'] = _panel_labels(fig, axs, args)
+    elif labels_series is not None:
+        label_y = _layer_shifts(number_series)
+        for i in range(number_series):
+            if labels_series[i] is not None:
+                artists['labels'].append(
+                    axs.text(layout['label_x'], label_y[i],
+                             s=labels_series[i],
+                             fontsize=args['font_size']))
+
+    if times_markers is not None:
+        mid_y = _raster_marker_y(args)
+        for i in range(number_series):
+            marker = None
+            if times_markers[i] is not None:
+                marker = axs.plot(times_markers[i], mid_y[i], '|', ms=14,
+                                  mew=3, color=event_color)[0]
+            artists['markers'].append(marker)
+
+    # Vertical line spanning all series.
+    for xv in times_vert_lines:
+        artists['vert_lines'] += axs.plot([xv, xv], ylim, 'k--',
+                                          clip_on=False, ms=14, mew=3)
+
+    args['artists'] = artists
+    return fig, axs
+
+
+def _raster_image(args):
+    """RGBA image of all series for _raster(), with its x and y limits."""
+    number_series = args['number_series']
+    time = args['time']
+    M = args['M']
+    CM = color_values(M, args['y_scale'], args['stats'])
+    lut = args['lut']
+    clim_global = args['clim_global']
+    y_scale = args['y_scale']
+    xlim_global = args['xlim_global']
+    ylim_global = args['ylim_global']
+    layout = args['layout']
+    layers = args['layers']
+
+    # One image pixel per screen pixel of the axes area.
+    dpi = layout['dpi']
+    width = max(int(round(layout['axes_width_inches'] * dpi)), 1)
+    height = max(int(round(layout['axes_height_inches'] * dpi)), 1)
+    line_px = max(args['marker_size'] * dpi / 72, 1)
+
+    if layers:
+        # Like matplotlib autoscaling: data range plus 5% margins, except
+        #   below the white fills, which stick to bottom_y.
+        xr = time.max() - time.min()
+        xlim = [time.min() - 0.05 * xr, time.max() + 0.05 * xr]
+    else:
+        xlim = xlim_global
+
+    # Extent of every series within each pixel column.
+    lo, hi = _raster_spans(time, M, xlim[0], xlim[1], width)
+    if CM is M:
+        clo, chi = lo, hi
+    else:
+        clo, chi = _raster_spans(time, CM, xlim[0], xlim[1], width)
+
+    if layers:
+        y_shifts = _layer_shifts(number_series)
+        bottom_y, top_y = _layer_span(args, hi + y_shifts)
+        yr = top_y - bottom_y
+        ylim = [bottom_y, top_y + 0.05 * yr]
+        rgba = _paint_layers(lo, hi, clo, chi, y_shifts, bottom_y, ylim,
+                             height, line_px, lut, clim_global)
+    else:
+        ylim = [0, number_series]
+        if y_scale == "log":
+            with np.errstate(invalid='ignore', divide='ignore'):
+                lo, hi = np.log10(lo), np.log10(hi)
+                band_ylim = np.log10(_raster_ylim(args))
+        else:
+            band_ylim = ylim_global
+        rgba = _paint_vanilla(lo, hi, clo, chi, band_ylim, height, line_px,
+                              lut, clim_global)
+    return rgba, xlim, ylim
+
+
+def _raster_marker_y(args):
+    """Height of the event marker of each series for _raster()."""
+    number_series = args['number_series']
+    mid_val = args['M'].mean(axis=0)
+    if args['layers']:
+        return mid_val + _layer_shifts(number_series)
+    band = number_series - 1 - np.arange(number_series)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return band + _band_fraction(mid_val, _raster_ylim(args),
+                                     args['y_scale'])
+
+
+def _raster_ylim(args):
+    """y limits of each band of _raster(): ylim_global, except that on a
+    log scale a lower limit that is not positive becomes the smallest
+    positive value of M, as matplotlib drops such a limit from a log axis
+    and autoscales to the positive data instead."""
+    ylim = args['ylim_global']
+    if args['y_scale'] != "log" or ylim[0] > 0:
+        return ylim
+    M = args['M']
+    positive = M[M > 0]
+    if positive.size == 0:
+        return ylim
+    return [positive.min(), ylim[1]]
+
+
+def _gradient(ax, x, y, rgba, args):
+    """Draw one series with a color gradient and return the artist.
+
+    rgba holds the uint8 colors of its points or segments (see _colors()).
+    """
+    if args['gradient'] == "line":
+        lc = LineCollection(_segments(x, y), colors=rgba / 255,
+                            linewidths=args['marker_size'],
+                            capstyle='round', joinstyle='round')
+        ax.add_collection(lc)
+        ax.autoscale_view()
+        return lc
+
+    return ax.scatter(x, y, s=args['marker_size']**2, c=rgba / 255)
+
+
+def _segments(x, y):
+    """Line segments between consecutive points, for LineCollection."""
+    points = np.column_stack((x, y))
+    return np.stack((points[:-1], points[1:]), axis=1)
+
+
+def _gradient_data(x, y, gradient):
+    """Segments of one series for gradient "line", else its points."""
+    if gradient == "line":
+        return _segments(x, y)
+    return np.column_stack((x, y))
+
+
+def _collection(ax, data, rgba, args):
+    """The artist of _gradient(), for data from _gradient_data() or
+    _occlusion().
+
+    Made directly rather than through Axes.scatter(), and added without
+    updating the data limits of ax: checking the input and scaling the
+    view for each series cost most of the time of a figure of many series.
+    """
+    if args['gradient'] == "line":
+        artist = LineCollection(data, colors=rgba / 255,
+                                linewidths=args['marker_size'],
+                                capstyle='round', joinstyle='round')
+    else:
+        # The marker of Axes.scatter(): a circle of area s points^2.
+        marker = mpl.markers.MarkerStyle('o')
+        artist = PathCollection(
+            (marker.get_path().transformed(marker.get_transform()),),
+            [args['marker_size']**2], facecolors=rgba / 255,
+            edgecolors='face', offsets=data, offset_transform=ax.transData)
+        artist.set_transform(mpl.transforms.IdentityTransform())
+    ax.add_collection(artist, autolim=False)
+    return artist
+
+
+# Update functions used by FirecrackerPlot: move the time, M and RGBA now in
+#   args into the artists that _render() made, without new artists.
+def _update(args):
+    if args['backend'] == "raster":
+        _update_raster(args)
+    elif args['layers']:
+        _update_layers(args)
+    else:
+        _update_vanilla(args)
+    args['sp'].set_clim(args['clim_global'])
+
+
+def _update_vanilla(args):
+    time = args['time']
+    M = args['M']
+    RGBA = args['RGBA']
+    xlim_global = args['xlim_global']
+    layout = args['layout']
+    axs = args['axs']
+    artists = args['artists']
+
+    if args['single_axes']:
+        # Heights within the bands depend on ylim_global.
+        bands = args['number_series'] - 1 - np.arange(args['number_series'])
+        for i, band in enumerate(bands):
+            _set_gradient(artists['gradients'][i], time,
+                          _band_y(M[:, i], band, args), RGBA[:, i])
+        for i, marker in enumerate(artists['markers']):
+            marker.set_ydata([_band_y(M[:, i].mean(), bands[i], args)])
+        bottom = axs
+    else:
+        for i, ax in enumerate(axs):
+            _set_gradient(artists['gradients'][i], time, M[:, i],
+                          RGBA[:, i])
+            ax.set_ylim(args['ylim_global'])
+            ax.set_xlim(xlim_global)
+        for i, marker in enumerate(artists['markers']):
+            marker.set_ydata([M[:, i].mean()])
+        bottom = axs[-1]
+
+    bottom.set_xticks(_x_ticks(xlim_global, layout['axes_width_inches'],
+                               args['font_size']))
+    bottom.set_xlim(xlim_global)
+    for line, xv in zip(artists['vert_lines'], args['times_vert_lines']):
+        txp = (xv - xlim_global[0]) / (xlim_global[1] - xlim_global[0])
+        line.set_xdata([txp, txp])
+
+
+def _update_layers(args):
+    time = args['time']
+    M = args['M']
+    RGBA = args['RGBA']
+    axs = args['axs']
+    artists = args['artists']
+
+    y_shifts = _layer_shifts(args['number_series'])
+    Y = M + y_shifts
+    bottom_y, top_y = _layer_span(args, Y)
+    polygons, data, rgba = _occlusion(time, Y, RGBA, args['gradient'],
+                                      bottom_y)
+    fill = artists['fills'][0]
+    fill.set_verts(polygons)
+    _set_collection(artists['gradients'][0], data, rgba)
+    args['bottom_y'] = bottom_y
+    for i, marker in enumerate(artists['markers']):
+        marker.set_ydata([M[:, i].mean() + y_shifts[i]])
+
+    # Autoscale to the new data, as when the artists were added.
+    _layer_limits(axs, time, bottom_y, top_y)
+    for text in artists['labels']:
+        text.set_x(_label_x(args['xlim_global']))
+    for line in artists['vert_lines']:
+        line.set_ydata(axs.get_ylim())
+
+
+def _update_raster(args):
+    axs = args['axs']
+    artists = args['artists']
+
+    rgba, xlim, ylim = _raster_image(args)
+    artists['image'].set_data(rgba)
+    artists['image'].set_extent((xlim[0], xlim[1], ylim[0], ylim[1]))
+    if not args['layers']:
+        axs.set_xticks(_x_ticks(xlim, args['layout']['axes_width_inches'],
+                                args['font_size']))
+    axs.set_xlim(xlim)
+    axs.set_ylim(ylim)
+
+    if artists['markers']:
+        mid_y = _raster_marker_y(args)
+        for i, marker in enumerate(artists['markers']):
+            if marker is not None:
+                marker.set_ydata([mid_y[i]])
+    if args['layers']:
+        for text in artists['labels']:
+            text.set_x(_label_x(args['xlim_global']))
+    for line in artists['vert_lines']:
+        line.set_ydata(ylim)
+
+
+# Zoom functions: frames reduced again for the x limits in view, moved
+#   into the artists that _render() made (see zoom_detail).
+def _data_axes(args):
+    """The Axes that show the series."""
+    axs = args['axs']
+    return list(axs) if isinstance(axs, np.ndarray) else [axs]
+
+
+def _zoom(args, ax):
+    """Callback of xlim_changed: show the full frames within the new x
+    limits of ax, reduced as in _prepare(). Only the series of ax are
+    reduced when each series has an Axes of its own.
+
+    Recorded as stage "zoom" of args['profile'].
+    """
+    profile = args['profile']
+    xlim = list(ax.get_xlim())
+    columns = slice(None)
+    if isinstance(args['axs'], np.ndarray):
+        columns = [list(args['axs']).index(ax)]
+
+    with _stage(profile, "zoom"):
+        with _stage(profile, "read"):
+            time, M = visible_frames(args['time_full'], args['M_full'], xlim)
+            M = M[:, columns]
+        if time.shape[0] < 2:
+            # Nothing of the series in view.
+            return
+        time, M = _reduce(profile, time, M, args['decimate'],
+                          args['upsample'], xlim, args['ylim_global'],
+                          args['layout'])
+        view = dict(args, time=time, M=M, xlim_global=xlim)
+        with _stage(profile, "color_mapping"):
+            view['RGBA'] = _colors(view)
+        with _stage(profile, "artists"):
+            _zoom_artists(view, columns)
+
+
+def _zoom_artists(view, columns):
+    """Give the artists of the series in columns the frames of view, which
+    is args with the reduced time, M and colors of those series only."""
+    time = view['time']
+    M = view['M']
+    RGBA = view['RGBA']
+    artists = view['artists']
+
+    if view['backend'] == "raster":
+        rgba, xlim, ylim = _raster_image(view)
+        artists['image'].set_data(rgba)
+        artists['image'].set_extent((xlim[0], xlim[1], ylim[0], ylim[1]))
+    elif view['layers']:
+        Y = M + _layer_shifts(view['number_series'])
+        polygons, data, rgba = _occlusion(time, Y, RGBA, view['gradient'],
+                                          view['bottom_y'])
+        artists['fills'][0].set_verts(polygons)
+        _set_collection(artists['gradients'][0], data, rgba)
+    elif view['single_axes']:
+        bands = view['number_series'] - 1 - np.arange(view['number_series'])
+        for i, band in enumerate(bands):
+            _set_gradient(artists['gradients'][i], time,
+                          _band_y(M[:, i], band, view), RGBA[:, i])
+    else:
+        _set_gradient(artists['gradients'][columns[0]], time, M[:, 0],
+                      RGBA[:, 0])
+
+
+def _set_gradient(artist, x, y, rgba):
+    """Give an artist made by _gradient() new data and colors."""
+    if isinstance(artist, LineCollection):
+        _set_collection(artist, _segments(x, y), rgba)
+    else:
+        _set_collection(artist, np.column_stack((x, y)), rgba)
+
+
+def _set_collection(artist, data, rgba):
+    """Give an artist made by _gradient() or _collection() new segments or
+    points, and their colors."""
+    if isinstance(artist, LineCollection):
+        artist.set_segments(data)
+        artist.set_color(rgba / 255)
+    else:
+        artist.set_offsets(data)
+        artist.set_facecolor(rgba / 255)
+
+
+def _view_limits(args):
+    """x and y limits of the Axes of the series, which layers autoscale to
+    the data."""
+    return [(ax.get_xlim(), ax.get_ylim()) for ax in _data_axes(args)]
+
+
+def _data_artists(args):
+    """Artists that change with the data, in drawing order.
+
+    Then any overlays: artists added to the figure afterwards that change
+    with it too (e.g. the clock of firecracker.animation).
+    """
+    artists = args['artists']
+    if 'image' in artists:
+        dynamic = [artists['image']]
+    else:
+        dynamic = []
+        for fill, gradient in zip(artists.get('fills', []),
+                                  artists['gradients']):
+            dynamic += [fill, gradient]
+        if not dynamic:
+            dynamic = list(artists['gradients'])
+    return (dynamic + [m for m in artists['markers'] if m is not None] +
+            artists.get('overlays', []))
+
+
+# Rasterizing functions used by _raster(). Pure NumPy, working on all
+#   series at once. Arrays of spans are pixel columns x series; images are
+#   pixel rows (top down) x pixel columns.
+def _raster_spans(time, M, x0, x1, width):
+    """Lowest and highest value of every series within each pixel column.
+
+    Besides the samples inside a column, the values where the line between
+    samples crosses the column edges are included, so lines stay connected
+    when there are fewer samples than columns. Columns outside the range of
+    time are NaN.
+    """
+    edges = np.linspace(x0, x1, width + 1)
+
+    # Values at the column edges, linear between samples.
+    j = np.searchsorted(time, edges, side='right') - 1
+    j = np.clip(j, 0, time.shape[0] - 2)
+    w = ((edges - time[j]) / (time[j + 1] - time[j]))[:, np.newaxis]
+    E = M[j] + (M[j + 1] - M[j]) * w
+    E[(edges < time[0]) | (edges > time[-1])] = np.nan
+    lo = np.fmin(E[:-1], E[1:])
+    hi = np.fmax(E[:-1], E[1:])
+
+    # Samples inside each column.
+    start = np.searchsorted(time, edges[:-1], side='left')
+    stop = np.searchsorted(time, edges[1:], side='left')
+    full = np.flatnonzero(stop > start)
+    if full.size:
+        kernel = _numba_inner_spans()
+        if kernel is not None:
+            kernel(M, start, stop, lo, hi)
+        else:
+            inner = M[:stop[full[-1]]]
+            lo[full] = np.fmin(lo[full], np.fmin.reduceat(
+                inner, start[full], axis=0))
+            hi[full] = np.fmax(hi[full], np.fmax.reduceat(
+                inner, start[full], axis=0))
+    return lo, hi
+
+
+def _inner_spans_loop(M, start, stop, lo, hi):
+    for c in range(start.shape[0]):
+        for k in range(start[c], stop[c]):
+            for s in range(M.shape[1]):
+                v = M[k, s]
+                # NaN is skipped, as by np.fmin and np.fmax.
+                if v != v:
+                    continue
+                if not v >= lo[c, s]:
+                    lo[c, s] = v
+                if not v <= hi[c, s]:
+                    hi[c, s] = v
+
+
+@functools.lru_cache(maxsize=None)
+def _numba_inner_spans():
+    """_inner_spans_loop compiled by numba, or None without numba."""
+    try:
+        import numba
+    except ImportError:
+        return None
+    return numba.njit(nogil=True)(_inner_spans_loop)
+
+
+def _band_fraction(y, ylim, y_scale):
+    """Position of y within ylim, from 0 at the bottom to 1 at the top."""
+    if y_scale == "log":
+        y = np.log10(y)
+        ylim = np.log10(ylim)
+    return (y - ylim[0]) / (ylim[1] - ylim[0])
+
+
+def _span_color(y, lo, hi, clo, chi):
+    """Color value at height y on a span from (lo, clo) to (hi, chi)."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        frac = np.clip((y - lo) / (hi - lo), 0, 1)
+    frac = np.where(hi > lo, frac, 0)
+    return clo + (chi - clo) * frac
+
+
+def _lookup(value, mask, lut, clim):
+    """RGBA image: colormap lookup of value where mask, else transparent."""
+    rgba = np.zeros(mask.shape + (4,), dtype=np.uint8)
+    rgba[mask] = map_colors(value[mask], lut, clim)
+    return rgba
+
+
+def _paint_vanilla(lo, hi, clo, chi, ylim, height, line_px, lut, clim):
+    """Each series in its own horizontal band, first series on top."""
+    width, number_series = lo.shape
+    h = height / number_series
+    yr = ylim[1] - ylim[0]
+    band_top = np.arange(number_series) * h
+
+    # Rows covered in each column, kept inside the band like an Axes clip.
+    with np.errstate(invalid='ignore'):
+        top = np.maximum(band_top + (ylim[1] - hi) / yr * h - line_px / 2,
+                         band_top)
+        bot = np.minimum(band_top + (ylim[1] - lo) / yr * h + line_px / 2,
+                         band_top + h)
+
+    rows = np.arange(height) + 0.5
+    band = np.minimum((rows / h).astype(np.intp), number_series - 1)
+    rows = rows[:, np.newaxis]
+    with np.errstate(invalid='ignore'):
+        mask = (rows >= top[:, band].T) & (rows <= bot[:, band].T)
+
+    y = ylim[1] - (rows - band_top[band][:, np.newaxis]) / h * yr
+    value = _span_color(y, lo[:, band].T, hi[:, band].T,
+                        clo[:, band].T, chi[:, band].T)
+    return _lookup(value, mask, lut, clim)
+
+
+def _paint_layers(lo, hi, clo, chi, y_shifts, bottom_y, ylim, height,
+                  line_px, lut, clim):
+    """Series shifted by y_shifts, each occluding the series before it.
+
+    As in _layers(), series i is filled white from its line down to
+    bottom_y and later series are painted over earlier ones. A pixel
+    therefore shows the last series whose line is at or above it.
+    """
+    width, number_series = lo.shape
+    yr = ylim[1] - ylim[0]
+    with np.errstate(invalid='ignore'):
+        top = (ylim[1] - (hi + y_shifts)) / yr * height - line_px / 2
+        bot = (ylim[1] - (lo + y_shifts)) / yr * height + line_px / 2
+    floor_row = (ylim[1] - bottom_y) / yr * height
+
+    # First row (by pixel center) reached by each series in each column.
+    first = np.ceil(top - 0.5)
+    valid = np.isfinite(first) & (first < height)
+    column, series = np.nonzero(valid)
+    first = np.maximum(first[valid], 0).astype(np.intp)
+
+    owner = np.full((height, width), -1, dtype=np.intp)
+    np.maximum.at(owner, (first, column), series)
+    owner = np.maximum.accumulate(owner, axis=0)
+
+    rows = np.arange(height)[:, np.newaxis] + 0.5
+    column = np.arange(width)[np.newaxis, :]
+    drawn = owner >= 0
+    owner = np.where(drawn, owner, 0)
+    line = drawn & (rows <= bot[column, owner])
+    fill = drawn & ~line & (rows <= floor_row)
+
+    y = ylim[1] - rows / height * yr - y_shifts[owner]
+    value = _span_color(y, lo[column, owner], hi[column, owner],
+                        clo[column, owner], chi[column, owner])
+    rgba = _lookup(value, line, lut, clim)
+    rgba[fill] = 255
+    return rgba
@@ -0,0 +1,246 @@
+""" Preparation of the frames to be drawn: reading them from memmaps and
+files, min/max decimation and linear upsampling.
+
+Depends on numpy only, so that data can be prepared without importing
+matplotlib."""
+
+import os
+
+import numpy as np
+
+# Frames are read and reduced in chunks of about this many bytes, from
+#   memmaps and files as from arrays: the temporaries of a chunk stay small
+#   next to the result, and in the CPU cache (faster than larger chunks).
+_CHUNK_BYTES = 2**20
+
+# Most points that upsample="adaptive" puts between two frames.
+_MAX_ADAPTIVE = 16
+
+
+def open_data(M, data_layout=None):
+    """M itself, or the file at path M opened as a read-only memmap.
+
+    data_layout describes the file (see firecracker()).
+    """
+    if not isinstance(M, (str, os.PathLike)):
+        return M
+    assert data_layout is not None, 'data_layout is needed when M is a path'
+    dtype = np.dtype(data_layout.get('dtype', np.float64))
+    number_series = data_layout['number_series']
+    offset = data_layout.get('offset', 0)
+    frame_bytes = dtype.itemsize * number_series
+    number_frames = (os.path.getsize(M) - offset) // frame_bytes
+    return np.memmap(M, dtype=dtype, mode='r', offset=offset,
+                     shape=(number_frames, number_series),
+                     order=data_layout.get('order', 'C'))
+
+
+def _dimensions_match(M, time, labels_series=None, times_markers=None):
+    """Whether time, labels_series and times_markers fit M (frames x
+    series). Prints which does not, as firecracker() reports bad input."""
+    number_frames, number_series = M.shape
+    checks = []
+    checks.append(int(time.shape[0] == number_frames))
+    if labels_series is not None:
+        checks.append(int(len(labels_series) == number_series))
+    if times_markers is not None:
+        checks.append(int(len(times_markers) == number_series))
+    if not np.prod(checks):
+        print("Some input dimensions do not match up.")
+        return False
+    return True
+
+
+def _chunks(M):
+    """Slices of M's frames, each about _CHUNK_BYTES."""
+    frame_bytes = max(M[:1].nbytes, 1)
+    step = max(_CHUNK_BYTES // frame_bytes, 1)
+    for start in range(0, M.shape[0], step):
+        yield slice(start, min(start + step, M.shape[0]))
+
+
+def _float_dtype(dtype):
+    """dtype of values interpolated or averaged from values of dtype.
+
+    float32 (and smaller ints) stay float32, half the memory of float64;
+    float64 and larger ints are float64.
+    """
+    return np.result_type(dtype, np.float32)
+
+
+def visible_frames(time, M, xlim_global):
+    """Frames within xlim_global, plus one either side to reach the edges."""
+    start = max(np.searchsorted(time, xlim_global[0], side='left') - 1, 0)
+    stop = np.searchsorted(time, xlim_global[1], side='right') + 1
+    return time[start:stop], M[start:stop]
+
+
+def reduce_frames(time, M, decimate, upsample, xlim_global, ylim_global,
+                  layout):
+    """Decimate and/or upsample the frames of M.
+
+    Parameters
+    ----------
+    time : numpy.ndarray
+        1d time values
+    M : numpy.ndarray
+        2d matrix of time-series data: Time x series
+    decimate : None, "auto" or int
+        as for firecracker()
+    upsample : int or "adaptive"
+        as for firecracker()
+    xlim_global, ylim_global : list
+        x and y limits of the figure
+    layout : dict
+        planned figure geometry. "auto" and "adaptive" use its
+        axes_width_inches, panel_height_inches, layer_offset, marker_size
+        and dpi.
+
+    Returns
+    -------
+    time : numpy.ndarray
+    M : numpy.ndarray
+    """
+    number_frames = M.shape[0]
+
+    # Min/max decimation down to about one bucket per pixel.
+    #   Long recordings have far more frames than the figure has pixels,
+    #   so most points would be drawn on top of each other.
+    if decimate is not None:
+        if decimate == "auto":
+            n_buckets = auto_buckets(time, xlim_global,
+                                     layout['axes_width_inches'],
+                                     layout['dpi'])
+        else:
+            n_buckets = decimate
+        time, M = decimate_minmax(time, M, n_buckets)
+        number_frames = time.shape[0]
+
+    # Linear interpolate to obtain greater sample of points.
+    #   This module uses point-drawing to display color gradient.
+    #   In some cases, large derivative causes points to be seen,
+    #   instead of a smooth line. In that case, let's interpolate
+    #   to give impression of line instead of points.
+    if upsample == "adaptive":
+        lower, weight = _adaptive_steps(time, M, xlim_global, ylim_global,
+                                        layout)
+        time = _lerp(time[:, np.newaxis], lower, weight)[:, 0]
+        M = _lerp(M, lower, weight)
+    elif upsample > 1:
+        number_frames_fine = number_frames * upsample
+        time_fine = np.linspace(time.min(), time.max(), number_frames_fine)
+        lower = np.clip(np.searchsorted(time, time_fine) - 1,
+                        0, number_frames - 2)
+        weight = ((time_fine - time[lower]) /
+                  (time[lower + 1] - time[lower]))
+        time = time_fine
+        M = _lerp(M, lower, weight)
+
+    return time, M
+
+
+def _lerp(M, lower, weight):
+    """Rows of M linearly interpolated between rows lower and lower + 1.
+
+    Computed a chunk of rows at a time, so the only array as large as the
+    result is the result itself. float32 stays float32 (see _float_dtype()).
+    """
+    M_fine = np.empty((lower.shape[0],) + M.shape[1:],
+                      dtype=_float_dtype(M.dtype))
+    weight = weight.astype(M_fine.dtype, copy=False)
+    for rows in _chunks(M_fine):
+        M_lower = M[lower[rows]]
+        M_upper = M[lower[rows] + 1]
+        M_fine[rows] = M_lower + weight[rows, np.newaxis] * (M_upper - M_lower)
+    return M_fine
+
+
+def _adaptive_steps(time, M, xlim_global, ylim_global, layout):
+    """Interpolation points for upsample="adaptive" (see _lerp()).
+
+    Each interval between frames is split into as many equal steps as
+    needed for the points of every series to be at most a marker diameter
+    apart on screen, judged from the planned axes size and the limits.
+    """
+    dpi = layout['dpi']
+    x_range = xlim_global[1] - xlim_global[0]
+    y_range = ylim_global[1] - ylim_global[0] + layout['layer_offset']
+    x_pixels = np.diff(time) * layout['axes_width_inches'] * dpi / x_range
+    y_per_value = layout['panel_height_inches'] * dpi / y_range
+
+    # Largest jump between frames across series, ignoring NaN.
+    y_jump = np.zeros(time.shape[0] - 1)
+    for rows in _chunks(M[:-1]):
+        chunk = M[rows.start:rows.stop + 1]
+        jump = np.fmax.reduce(np.abs(np.diff(chunk, axis=0)), axis=1)
+        y_jump[rows] = np.nan_to_num(jump)
+
+    gap = np.hypot(x_pixels, y_jump * y_per_value)
+    diameter = layout['marker_size'] * dpi / 72
+    steps = np.clip(np.ceil(gap / diameter), 1, _MAX_ADAPTIVE).astype(int)
+
+    # Step j of interval i is at weight j / steps[i] from frame i.
+    lower = np.repeat(np.arange(steps.shape[0]), steps)
+    first = np.repeat(np.cumsum(steps) - steps, steps)
+    weight = (np.arange(lower.shape[0]) - first) / steps[lower]
+
+    # And the last frame itself.
+    lower = np.append(lower, steps.shape[0] - 1)
+    weight = np.append(weight, 1.0)
+    return lower, weight
+
+
+def auto_buckets(time, xlim_global, width_inches, dpi):
+    """Number of decimation buckets giving one bucket per pixel in view."""
+    pixels = width_inches * dpi
+    time_range = time.max() - time.min()
+    if time_range > 0:
+        # Zoomed in: only part of the series is spread across the pixels.
+        x_range = xlim_global[1] - xlim_global[0]
+        pixels = pixels * max(time_range / x_range, 1)
+    return int(np.ceil(pixels))
+
+
+def decimate_minmax(time, M, n_buckets):
+    """Min/max decimation of all columns of M at once.
+
+    Frames are split into n_buckets buckets, of as equal a number of frames
+    as can be, with edges at np.linspace() of the frames so that every frame
+    falls in one. Each bucket is replaced by its minimum and maximum, in the
+    order they occur, placed at the first and last time of the bucket.
+
+    Buckets are reduced a chunk at a time, so that a memmap M is read once
+    and only the decimated frames are kept in memory.
+    """
+    number_frames = M.shape[0]
+    if number_frames // n_buckets < 3:
+        # Nothing to gain: every bucket would keep 2 of at most 2 frames.
+        return time, M
+
+    edges = np.linspace(0, number_frames, n_buckets + 1).astype(np.intp)
+    longest = int(np.max(np.diff(edges)))
+    M_out = np.empty((2 * n_buckets,) + M.shape[1:], dtype=M.dtype)
+    step = max(_CHUNK_BYTES // max(M[:longest].nbytes, 1), 1)
+    for first in range(0, n_buckets, step):
+        last = min(first + step, n_buckets)
+        rows = M[edges[first]:edges[last]]
+        # Buckets padded to the longest by repeating their last frame,
+        #   which changes neither their extremes nor where these first
+        #   occur.
+        starts = edges[first:last] - edges[first]
+        index = np.minimum(starts[:, np.newaxis] + np.arange(longest),
+                           (edges[first + 1:last + 1] - edges[first] -
+                            1)[:, np.newaxis])
+        B = rows[index]
+        i_min = B.argmin(axis=1)[:, np.newaxis]
+        i_max = B.argmax(axis=1)[:, np.newaxis]
+        v_min = np.take_along_axis(B, i_min, axis=1)[:, 0]
+        v_max = np.take_along_axis(B, i_max, axis=1)[:, 0]
+        min_first = i_min[:, 0] <= i_max[:, 0]
+        M_out[2 * first:2 * last:2] = np.where(min_first, v_min, v_max)
+        M_out[2 * first + 1:2 * last:2] = np.where(min_first, v_max, v_min)
+
+    time_out = np.empty(2 * n_buckets, dtype=time.dtype)
+    time_out[0::2] = time[edges[:-1]]
+    time_out[1::2] = time[edges[1:] - 1]
+    return time_out, M_out
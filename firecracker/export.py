@@ -0,0 +1,249 @@
+""" Export of the geometry of a firecracker figure, for drawing elsewhere
+(e.g. in a browser) instead of as an image.
+
+export_geometry() works out what firecracker() would draw, with the same
+steps (filtering, limits, colormap, layer offsets, min/max decimation),
+and writes it as a compact binary payload rather than a figure: typed
+arrays of the decimated coordinates and of the color of each point, as
+uint8 indices into the colormap, after a small JSON manifest. Nothing is
+drawn: only numpy is used, and matplotlib's colormap for the lut.
+
+The payload is laid out as
+
+    b"FCG1"             4 bytes
+    manifest length     uint32, little-endian
+    manifest            JSON (UTF-8), padded with spaces to 8 bytes
+    arrays              little-endian, each at the offset in the
+                        manifest (from the start), 8-byte aligned
+
+so that each array can be viewed in place, e.g. in JavaScript as
+new Float32Array(buffer, offset, length). The arrays are
+
+    time        float32 (frames): time - manifest["x0"]
+    y           float32 (series x frames): each series contiguous
+    color       uint8 (series x frames): index into lut of each point
+    lut         uint8 (colors x 4): RGBA of the colormap
+
+    >>> report = export_geometry("erp.fcg", M, time, "Voltage", width=800)
+    >>> manifest, arrays = read_geometry("erp.fcg")
+"""
+
+import json
+import time as _time
+
+import numpy as np
+
+from .colors import color_index, color_values, colormap_lut
+from .decimation import (_chunks, _dimensions_match, auto_buckets,
+                         decimate_minmax, open_data, visible_frames)
+from .limits import _layer_shifts, data_limits, data_stats
+from .preprocess import filter_frames
+
+_MAGIC = b"FCG1"
+_VERSION = 1
+_ALIGN = 8
+
+
+# Main functions
+def export_geometry(fname, M, time, label_colorbar, labels_series=None,
+                    times_markers=None, times_vert_lines=[],
+                    xlim_global=None, y_range_type="min_to_max",
+                    y_scale="linear", layers=False, decimate="auto",
+                    width=1000, data_layout=None, smooth=None, diff=0,
+                    percentiles=(1, 99), percentile_error=0.001):
+    """Write the geometry of a firecracker figure as a binary payload.
+
+    Parameters
+    ----------
+    fname : str or file-like
+        where to write the payload. None: not written, only returned.
+    M, time, label_colorbar, labels_series, times_markers,
+    times_vert_lines, xlim_global, y_range_type, y_scale, layers,
+    data_layout, smooth, diff, percentiles, percentile_error :
+        as for firecracker()
+    decimate : None, "auto" or int
+        as for firecracker(): "auto" is one bucket per pixel of width.
+    width : int
+        width in pixels of the plots where the payload will be drawn
+
+    Returns
+    -------
+    report : dict
+        "manifest": the manifest written, with the dtype, shape and
+            offset of each array in "arrays"
+        "payload": the payload, as bytes
+        "bytes": its size
+        "seconds": time to make and write it
+        or None when the input is not valid.
+    """
+    start = _time.perf_counter()
+    M = open_data(M, data_layout)
+    time = np.asarray(time)
+
+    # Shape of data and check consistency.
+    number_frames, number_series = M.shape
+    if not _dimensions_match(M, time, labels_series, times_markers):
+        return None
+    assert (decimate is None or decimate == "auto" or
+            (isinstance(decimate, int) and decimate > 0)), \
+        'decimate should be None, "auto" or a positive int'
+
+    if smooth is not None or diff:
+        M, time = filter_frames(M, time, smooth, diff)
+        if M is None:
+            return None
+    if np.ndim(times_vert_lines) == 0:
+        times_vert_lines = [times_vert_lines]
+    if xlim_global is None:
+        xlim_global = [time.min(), time.max()]
+
+    # The limits of all frames, before decimation, as in firecracker().
+    if y_range_type != "percentile":
+        percentile_error = None
+    stats = data_stats(M, percentile_error)
+    limits = data_limits(stats, y_range_type, y_scale, layers, percentiles)
+    if limits is None:
+        print("Invalid value for y_range_type.")
+        return None
+
+    # Only the frames in view, decimated to the pixels of width.
+    time, M = visible_frames(time, M, xlim_global)
+    if time.shape[0] < 2:
+        print("No frames within xlim_global.")
+        return None
+    if decimate is not None:
+        n_buckets = decimate
+        if decimate == "auto":
+            n_buckets = auto_buckets(time, xlim_global, width, 1)
+        time, M = decimate_minmax(time, M, n_buckets)
+
+    lut = colormap_lut(limits['cmap'])
+    arrays = {
+        'time': (time - time[0]).astype(np.float32),
+        'y': np.ascontiguousarray(M.T, dtype=np.float32),
+        'color': _color_indices(M, y_scale, stats, lut.shape[0],
+                                limits['clim_global']),
+        'lut': lut,
+    }
+    manifest = {
+        'version': _VERSION,
+        'number_series': number_series,
+        'number_frames': int(time.shape[0]),
+        'x0': float(time[0]),
+        'xlim_global': _floats(xlim_global),
+        'ylim_global': _floats(limits['ylim_global']),
+        'clim_global': _floats(limits['clim_global']),
+        'cmap': limits['cmap'],
+        'event_color': limits['event_color'],
+        'y_scale': y_scale,
+        'y_range_type': y_range_type,
+        'percentiles': _floats(percentiles),
+        'label_colorbar': label_colorbar,
+        'labels_series': None if labels_series is None else
+        [None if label is None else str(label) for label in labels_series],
+        'times_markers': None if times_markers is None else
+        [None if t is None else float(t) for t in times_markers],
+        'times_vert_lines': _floats(times_vert_lines),
+        'layers': bool(layers),
+    }
+    if layers:
+        # Each series is drawn shifted up by its offset, over the series
+        #   before it, with a fill down to bottom_y.
+        manifest['layer_offsets'] = _floats(_layer_shifts(number_series))
+        manifest['bottom_y'] = float(np.nanmin(M))
+
+    payload = _pack(manifest, arrays)
+    if fname is not None:
+        if hasattr(fname, 'write'):
+            fname.write(payload)
+        else:
+            with open(fname, 'wb') as f:
+                f.write(payload)
+    return {'manifest': manifest, 'payload': payload,
+            'bytes': len(payload),
+            'seconds': _time.perf_counter() - start}
+
+
+def read_geometry(source):
+    """The manifest and arrays of a payload of export_geometry().
+
+    Parameters
+    ----------
+    source : str, bytes or file-like
+        path of the payload, or the payload itself
+
+    Returns
+    -------
+    manifest : dict
+    arrays : dict of numpy.ndarray
+        read-only views of the payload, by name
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        payload = bytes(source)
+    elif hasattr(source, 'read'):
+        payload = source.read()
+    else:
+        with open(source, 'rb') as f:
+            payload = f.read()
+    assert payload[:4] == _MAGIC, 'not a firecracker geometry payload'
+    length = int(np.frombuffer(payload, '<u4', 1, 4)[0])
+    manifest = json.loads(payload[8:8 + length].decode('utf-8'))
+    arrays = {}
+    for name, info in manifest['arrays'].items():
+        count = int(np.prod(info['shape']))
+        arrays[name] = np.frombuffer(payload, info['dtype'], count,
+                                     info['offset']).reshape(info['shape'])
+    return manifest, arrays
+
+
+# Helper functions
+def _color_indices(M, y_scale, stats, N, clim):
+    """uint8 index into a lut of N colors of each value of M, series x
+    frames, mapped a chunk of frames at a time."""
+    assert N <= 256, 'the colormap should have at most 256 colors'
+    index = np.empty(M.shape[::-1], dtype=np.uint8)
+    for rows in _chunks(M):
+        index[:, rows] = color_index(color_values(M[rows], y_scale, stats),
+                                     N, clim).T
+    return index
+
+
+def _pack(manifest, arrays):
+    """Payload of manifest and arrays, laid out as in the module docstring.
+
+    The layout of the arrays is added to manifest, as manifest["arrays"]:
+    dtype, shape and offset of each, by name.
+    """
+    # The offsets of the arrays depend on the length of the manifest that
+    #   lists them: laid out again until that length is enough.
+    length = 0
+    while True:
+        offset = 8 + length
+        layout = {}
+        for name, array in arrays.items():
+            layout[name] = {'dtype': array.dtype.newbyteorder('<').str,
+                            'shape': list(array.shape), 'offset': offset}
+            offset = _padded(offset + array.nbytes)
+        manifest['arrays'] = layout
+        text = json.dumps(manifest, separators=(',', ':')).encode('utf-8')
+        needed = _padded(8 + len(text)) - 8
+        if needed <= length:
+            break
+        length = needed
+
+    parts = [_MAGIC, np.array(length, dtype='<u4').tobytes(),
+             text.ljust(length)]
+    for name, array in arrays.items():
+        data = array.astype(layout[name]['dtype'], copy=False).tobytes()
+        parts.append(data.ljust(_padded(len(data)), b"\0"))
+    return b"".join(parts)
+
+
+def _padded(offset):
+    """offset rounded up to a multiple of _ALIGN."""
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def _floats(values):
+    """values as a list of floats, for JSON."""
+    return [float(v) for v in values]
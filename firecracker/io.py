@@ -0,0 +1,226 @@
+""" Loaders for the data layouts used by the examples.
+
+Each loader returns a pair (M, time) ready for firecracker: M is a 2d matrix
+of Time x series and time holds the 1d time values.
+
+Text files are parsed a chunk at a time by numpy, not cell by cell in Python.
+The parsed table is saved as a .npy sidecar in a cache directory, so that
+loading the same file again involves no parsing. The sidecar is used for as
+long as it is newer than the text file. The cache directory is
+$FIRECRACKER_CACHE, else firecracker in the user's cache directory
+($XDG_CACHE_HOME or ~/.cache), so that nothing is written next to the data,
+which may be read-only or under version control."""
+
+import hashlib
+import os
+
+import numpy as np
+
+from .decimation import open_data
+
+# Text files are parsed in chunks of about this many bytes.
+_CHUNK_BYTES = 16 * 2**20
+
+
+# Loaders
+def load_wide(path, time=None, delimiter=",", cache=True):
+    """Load a text file with one series per row and one frame per column.
+
+    This is the layout of examples/data/pulsar.csv.
+
+    Parameters
+    ----------
+    path : str
+        text file of numbers separated by delimiter
+    time : numpy.ndarray
+        1d time values, one for each column. Default is 0, 1, 2 ...
+    delimiter : str
+        separator of values within a row
+    cache : bool or str
+        whether to read and write a .npy sidecar of the parsed table, or
+        the directory to keep it in
+
+    Returns
+    -------
+    M : numpy.ndarray
+        2d matrix of time-series data: Time x series
+    time : numpy.ndarray
+        1d time values
+    """
+    M = _read_table(path, delimiter, cache).T
+    if time is None:
+        time = np.arange(M.shape[0], dtype=float)
+    time = np.asarray(time)
+    assert time.shape[0] == M.shape[0], 'One time value is needed per column'
+    return M, time
+
+
+def load_long(path, number_series, delimiter=",", cache=True):
+    """Load a text file with a column of time and a column of values, in
+    which the series follow one another and have the same number of frames.
+
+    This is the layout of examples/data/pulsar_readable.csv. Lines that
+    start with # are skipped.
+
+    Parameters
+    ----------
+    path : str
+        text file with 2 columns: time, value
+    number_series : int
+        number of series, stored one after the other
+    delimiter : str
+        separator of the 2 columns
+    cache : bool or str
+        whether to read and write a .npy sidecar of the parsed table, or
+        the directory to keep it in
+
+    Returns
+    -------
+    M : numpy.ndarray
+        2d matrix of time-series data: Time x series
+    time : numpy.ndarray
+        1d time values of the first series
+    """
+    table = _read_table(path, delimiter, cache)
+    assert table.shape[1] == 2, 'Expected 2 columns: time, value'
+    number_frames = table.shape[0] // number_series
+    assert number_frames * number_series == table.shape[0], \
+        'Number of rows must be a multiple of number_series'
+    M = table[:, 1].reshape((number_series, number_frames)).T
+    time = table[:number_frames, 0]
+    return M, time
+
+
+def load_bin(path, number_series, time=None, dtype="float64", order="F",
+             mmap=False):
+    """Load a raw binary file of a Time x series matrix.
+
+    This is the layout of examples/data/MERP_S7.bin: float64, stored series
+    by series (order "F").
+
+    Parameters
+    ----------
+    path : str
+        binary file with no header
+    number_series : int
+        number of series
+    time : numpy.ndarray
+        1d time values, one for each frame. Default is 0, 1, 2 ...
+    dtype : str or numpy.dtype
+        data type of each value
+    order : str
+        "F" (series by series) or "C" (frame by frame)
+    mmap : bool
+        return a read-only numpy.memmap instead of reading the file.
+        firecracker then reads only the frames it shows, in chunks.
+
+    Returns
+    -------
+    M : numpy.ndarray or numpy.memmap
+        2d matrix of time-series data: Time x series
+    time : numpy.ndarray
+        1d time values
+    """
+    if mmap:
+        M = open_data(path, {'number_series': number_series,
+                              'dtype': dtype, 'order': order})
+    else:
+        M = np.fromfile(path, dtype=dtype)
+        M = M.reshape((-1, number_series), order=order)
+    if time is None:
+        time = np.arange(M.shape[0], dtype=float)
+    time = np.asarray(time)
+    assert time.shape[0] == M.shape[0], 'One time value is needed per frame'
+    return M, time
+
+
+# Helpers
+def _read_table(path, delimiter, cache):
+    """2d table of a text file, from its .npy sidecar when that is fresh."""
+    path = os.fspath(path)
+    sidecar = None
+    if cache:
+        sidecar = _sidecar(path, None if cache is True else cache)
+    if sidecar is not None and os.path.exists(sidecar) and \
+            os.path.getmtime(sidecar) >= os.path.getmtime(path):
+        return np.load(sidecar)
+
+    table = _parse(path, delimiter)
+    if sidecar is not None:
+        # Written under a temporary name first, so that a reader running at
+        #   the same time never finds half a sidecar.
+        partial = sidecar + ".%d.partial" % os.getpid()
+        try:
+            os.makedirs(os.path.dirname(sidecar), exist_ok=True)
+            with open(partial, 'wb') as f:
+                np.save(f, table)
+            os.replace(partial, sidecar)
+        except OSError:
+            # Cache directory not writable: keep going without a cache.
+            try:
+                os.remove(partial)
+            except OSError:
+                pass
+    return table
+
+
+def _sidecar(path, directory=None):
+    """Path of the .npy sidecar of text file path, in directory or the
+    cache directory (see module docstring). Named after the file and a
+    hash of its absolute path, so that files of the same name in
+    different directories do not share one."""
+    if directory is None:
+        directory = os.environ.get('FIRECRACKER_CACHE')
+    if directory is None:
+        base = (os.environ.get('XDG_CACHE_HOME') or
+                os.path.join(os.path.expanduser("~"), ".cache"))
+        directory = os.path.join(base, "firecracker")
+    digest = hashlib.blake2b(os.path.abspath(path).encode(),
+                             digest_size=8).hexdigest()
+    return os.path.join(directory, "%s.%s.npy" % (os.path.basename(path),
+                                                  digest))
+
+
+def _parse(path, delimiter):
+    """Parse a delimited text file of numbers into a 2d float64 array."""
+    sep = delimiter.encode()
+    blocks = []
+    number_columns = None
+    with open(path, 'rb') as f:
+        rest = b''
+        while True:
+            block = f.read(_CHUNK_BYTES)
+            text = rest + block
+            if block:
+                # Only whole lines are parsed; the rest waits for more.
+                cut = text.rfind(b'\n') + 1
+                text, rest = text[:cut], text[cut:]
+            lines = _data_lines(text)
+            if lines:
+                if number_columns is None:
+                    first = lines.split(b'\n', 1)[0]
+                    number_columns = first.count(sep) + 1
+                values = np.fromstring(lines.replace(b'\n', sep).decode(),
+                                       sep=delimiter)
+                blocks.append(values)
+            if not block:
+                break
+    if number_columns is None:
+        return np.empty((0, 0))
+    values = np.concatenate(blocks)
+    assert values.size % number_columns == 0, \
+        'Every row must have the same number of values'
+    return values.reshape((-1, number_columns))
+
+
+def _data_lines(text):
+    """Lines of text that hold data, joined by newlines, without the last.
+
+    Comments (#), blank lines and carriage returns are dropped. This is done
+    line by line only when the chunk has something to drop.
+    """
+    text = text.replace(b'\r', b'')
+    if b'#' in text or b'\n\n' in text or text.startswith(b'\n'):
+        text = b'\n'.join(line for line in text.split(b'\n')
+                          if line.strip() and not line.startswith(b'#'))
+    return text.strip(b'\n')
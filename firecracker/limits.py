@@ -0,0 +1,150 @@
+""" Common scales of a firecracker figure: the y-axis and color ranges,
+colormap and event color, from the minimum and maximum of the data, and
+the offsets of layered series.
+
+Depends on numpy only, so that limits can be worked out without importing
+matplotlib."""
+
+import numpy as np
+
+from .decimation import _chunks
+from .quantiles import QuantileSketch
+
+
+def data_stats(M, percentile_error=None):
+    """Minimum, maximum and largest absolute value of M.
+
+    One pass over M in chunks, so memmaps are read once with bounded memory.
+    NaN values are left out.
+    The largest absolute value follows from the others, without np.abs(M).
+    With percentile_error, the same pass also fills a QuantileSketch of the
+    values, with that rank error, as "sketch".
+    """
+    minv = np.inf
+    maxv = -np.inf
+    sketch = None
+    if percentile_error is not None:
+        sketch = QuantileSketch(percentile_error)
+    for rows in _chunks(M):
+        chunk = M[rows]
+        # NaN is skipped, as by QuantileSketch; all NaN leaves +-inf.
+        minv = np.fmin(minv, np.fmin.reduce(chunk, axis=None))
+        maxv = np.fmax(maxv, np.fmax.reduce(chunk, axis=None))
+        if sketch is not None:
+            sketch.update(chunk)
+    stats = {'min': minv, 'max': maxv, 'absmax': max(-minv, maxv)}
+    if sketch is not None:
+        stats['sketch'] = sketch
+    return stats
+
+
+def merge_stats(a, b):
+    """Stats of two sets of frames combined."""
+    stats = {'min': min(a['min'], b['min']),
+             'max': max(a['max'], b['max']),
+             'absmax': max(a['absmax'], b['absmax'])}
+    if 'sketch' in a and 'sketch' in b:
+        stats['sketch'] = a['sketch'].merge(b['sketch'])
+    return stats
+
+
+def data_limits(stats, y_range_type, y_scale="linear", layers=False,
+                percentiles=(1, 99)):
+    """ylim_global, clim_global, cmap and event_color from the stats of M.
+
+    Parameters
+    ----------
+    stats : dict
+        min, max and absmax of M, from data_stats(), and its sketch for
+        y_range_type "percentile"
+    y_range_type, y_scale, layers, percentiles :
+        as for firecracker()
+
+    Returns
+    -------
+    limits : dict
+        "ylim_global", "clim_global", "cmap" (name of a matplotlib
+        colormap) and "event_color". None for an invalid y_range_type.
+    """
+    mult_y = 1.3  # Scalar to stretch y axis range
+    mult_c = 1.0  # Scalar to stretch color range
+
+    # Range of the color values CM (see colors.color_values()).
+    if y_scale == "log":
+        eps = np.finfo(float).eps
+        cmin = np.log10(eps)
+        cmax = np.log10(stats['max'] - stats['min'] + eps)
+    else:
+        cmin = stats['min']
+        cmax = stats['max']
+
+    if y_range_type == "symmetric_around_zero":
+        maxAbsY = round(stats['absmax'] * mult_y)
+        ylim_global = [-maxAbsY, maxAbsY]
+
+        cmap = 'coolwarm'
+        event_color = "#31a354"
+        maxAbsC = round(stats['absmax'] * mult_c)
+        clim_global = [-maxAbsC, maxAbsC]
+    elif y_range_type == "min_to_max":
+        maxv = stats['max']
+        minv = stats['min']
+        new_range = (maxv - minv) * mult_y
+        midv = (maxv-minv)/2 + minv
+        ylim_global = [midv - new_range/2, midv + new_range/2]
+
+        maxv = cmax
+        minv = cmin
+        new_range = (maxv - minv) * mult_c
+        midv = (maxv-minv)/2 + minv
+
+        clim_global = [midv - new_range/2, midv + new_range/2]
+        cmap = 'inferno'
+        event_color = "#31a354"
+
+        if layers:
+            cmap = 'viridis_r'  # viridis_r for layers.
+
+    elif y_range_type == "percentile":
+        # As min_to_max, from percentiles instead: values beyond them, such
+        #   as artifacts, go off the axes and take the end colors.
+        lowv, highv = stats['sketch'].quantile(np.divide(percentiles, 100))
+        new_range = (highv - lowv) * mult_y
+        midv = (highv-lowv)/2 + lowv
+        ylim_global = [midv - new_range/2, midv + new_range/2]
+
+        if y_scale == "log":
+            lowv, highv = np.log10(np.array([lowv, highv]) - stats['min'] +
+                                   eps)
+        new_range = (highv - lowv) * mult_c
+        midv = (highv-lowv)/2 + lowv
+
+        clim_global = [midv - new_range/2, midv + new_range/2]
+        cmap = 'inferno'
+        event_color = "#31a354"
+
+        if layers:
+            cmap = 'viridis_r'  # viridis_r for layers.
+
+    elif y_range_type == "zero_to_max":
+        ylim_global = [0, stats['max']*mult_y]
+
+        clim_global = [0, cmax*mult_c]
+        cmap = 'inferno'
+        event_color = "#31a354"
+    else:
+        return None
+
+    limits = {}
+    limits['ylim_global'] = ylim_global
+    limits['clim_global'] = clim_global
+    limits['cmap'] = cmap
+    limits['event_color'] = event_color
+    return limits
+
+
+def _layer_shifts(number_series):
+    """Vertical offset of each series when layered, first series on top."""
+    y_spacing = 5
+    y_shifts = np.linspace(0, number_series*y_spacing, number_series)
+    return y_shifts[::-1]
@@ -0,0 +1,173 @@
+""" Saving firecracker figures to a file size or a number of points.
+
+save_figure() makes a figure and saves it, choosing what firecracker()
+leaves to its caller so that the file comes out within a budget:
+
+    point budget    decimation, so that at most max_points points are
+                    drawn, and no more than one bucket per pixel
+    file size       the dpi, lowered until the file is within max_bytes
+
+Vector output (SVG, PDF, EPS) is hybrid by default: the gradients and
+fills of the series are images, at the dpi chosen, while text, axes,
+colorbar, event markers and vertical lines stay vectors (see the rasterize
+argument of firecracker()). Its size then follows the dpi, as for PNG.
+
+    >>> report = save_figure("pulsar.pdf", M, time, "Radio intensity",
+    ...                      layers=True, max_bytes=200_000)
+    >>> report['dpi'], report['bytes']
+"""
+
+import io
+import os
+import time as _time
+
+import numpy as np
+
+from .decimation import auto_buckets
+
+# Formats drawn as vectors, where the series may be rasterized.
+_VECTOR_FORMATS = ("svg", "svgz", "pdf", "eps", "ps")
+# The dpi is not lowered below this, nor more times than this.
+_MIN_DPI = 20
+_MAX_ATTEMPTS = 6
+# Aim this far below the size asked for, which is only estimated.
+_SIZE_MARGIN = 0.95
+
+
+# Main function
+def save_figure(fname, M, time, label_colorbar, format=None, dpi=None,
+                max_bytes=None, max_points=None, **kwargs):
+    """Make a firecracker figure and save it within a size budget.
+
+    Parameters
+    ----------
+    fname : str or file-like
+        where to save, as for matplotlib's savefig
+    M, time, label_colorbar :
+        as for firecracker()
+    format : str
+        file format, e.g. "png", "svg" or "pdf". Defaults to the extension
+        of fname, else matplotlib's savefig.format.
+    dpi : float
+        resolution of the figure, or of its rasterized series in vector
+        output. Defaults to matplotlib's savefig.dpi. The most it is when
+        max_bytes is given.
+    max_bytes : int
+        largest file wanted. The dpi is lowered until the file fits (down
+        to 20), or, for vector output with rasterize=False, the number of
+        points drawn.
+    max_points : int
+        most points drawn over all series: min/max decimation to
+        max_points / 2 buckets of each series at most.
+    **kwargs
+        any other keyword argument of firecracker(), with other defaults:
+        decimate to one bucket per pixel of the axes at dpi (and within
+        max_points), and rasterize True for vector output. A decimate
+        given is kept, and max_points ignored.
+
+    Returns
+    -------
+    report : dict
+        "format", "dpi", "decimate": what the figure was saved with
+        "bytes": size of the file
+        "attempts": number of times the figure was saved
+        "seconds": time to make and save the figure
+        or None when the input is not valid.
+    """
+    import matplotlib as mpl
+    from .core import _plan_layout, firecracker
+
+    start = _time.perf_counter()
+    if format is None:
+        extension = os.path.splitext(fname)[1][1:] \
+            if isinstance(fname, (str, os.PathLike)) else ""
+        format = extension.lower() or mpl.rcParams['savefig.format']
+    if dpi is None or dpi == "figure":
+        dpi = mpl.rcParams['savefig.dpi']
+        if dpi == "figure":
+            dpi = mpl.rcParams['figure.dpi']
+    vector = format in _VECTOR_FORMATS
+    kwargs.setdefault('rasterize', vector)
+    # Only the dpi changes the size of rasterized series.
+    fit_points = vector and not kwargs['rasterize']
+
+    if kwargs.get('decimate') is None:
+        number_series = _number_series(M, kwargs.get('data_layout'))
+        time = np.asarray(time)
+        xlim_global = kwargs.get('xlim_global')
+        if xlim_global is None:
+            xlim_global = [time.min(), time.max()]
+        # Font size does not change the width of the axes.
+        layout = _plan_layout(number_series, xlim_global,
+                              kwargs.get('layers', False), 12)
+        buckets = auto_buckets(time, xlim_global,
+                               layout['axes_width_inches'], dpi)
+        if max_points is not None:
+            buckets = min(buckets, max(max_points // (2 * number_series), 1))
+        kwargs['decimate'] = buckets
+
+    fig = None
+    attempts = 0
+    last = None
+    while True:
+        if fig is None:
+            fig = firecracker(M, time, label_colorbar,
+                              **dict(kwargs, pyplot=False))
+            if fig is None:
+                return None
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=format, dpi=dpi, bbox_inches='tight')
+        attempts += 1
+        size = buffer.tell()
+        if (max_bytes is None or size <= max_bytes or
+                attempts == _MAX_ATTEMPTS):
+            break
+        target = _SIZE_MARGIN * max_bytes
+        if fit_points and isinstance(kwargs['decimate'], int):
+            # File size follows the number of points drawn.
+            kwargs['decimate'] = max(int(kwargs['decimate'] * target / size),
+                                     1)
+            fig = None
+        elif not fit_points and dpi > _MIN_DPI:
+            # And otherwise the number of pixels, which goes as dpi^2.
+            fitted = max(_fit_dpi(dpi, size, last, target), _MIN_DPI)
+            last = (dpi, size)
+            dpi = fitted
+        else:
+            break
+
+    if hasattr(fname, 'write'):
+        fname.write(buffer.getvalue())
+    else:
+        with open(fname, 'wb') as f:
+            f.write(buffer.getvalue())
+    return {'format': format, 'dpi': float(dpi),
+            'decimate': kwargs['decimate'],
+            'bytes': size, 'attempts': attempts,
+            'seconds': _time.perf_counter() - start}
+
+
+# Helper functions
+def _fit_dpi(dpi, size, last, target):
+    """dpi at which the file would be target bytes, from its size at dpi
+    and at the dpi before (last: (dpi, size), or None).
+
+    The size is taken as a + b dpi^2: what is drawn as vectors, plus
+    images. From a single size, as b dpi^2 alone.
+    """
+    a = 0.0
+    b = size / dpi**2
+    if last is not None and last[0] != dpi:
+        b = (last[1] - size) / (last[0]**2 - dpi**2)
+        a = size - b * dpi**2
+    if b <= 0 or target <= a:
+        return 0.0
+    return np.sqrt((target - a) / b)
+
+
+def _number_series(M, data_layout):
+    """Number of series of M, an array or a file described by data_layout.
+    """
+    if isinstance(M, (str, os.PathLike)):
+        return data_layout['number_series']
+    return np.shape(M)[1]
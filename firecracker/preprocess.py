@@ -0,0 +1,348 @@
+""" Preparation of recordings for firecracker.
+
+fold() cuts a recording of a periodic signal (a pulsar, a train of stimuli)
+into epochs of one period each, the series of a firecracker figure, and
+estimate_period() finds that period from the signal itself.
+
+diff() and smooth() take differences and moving averages of every series
+at once, along the time axis, and return time values aligned with the
+result. firecracker(..., diff=1, smooth=7) applies both before drawing.
+Long kernels are applied through FFTs. float32 series stay float32.
+
+When the period is a whole number of samples the epochs are a view of the
+recording (no copy, so a memmap stays on disk until drawn). Otherwise each
+epoch starts a fraction of a sample later than a whole number of samples,
+and is resampled from the recording by linear interpolation, a chunk of
+epochs at a time."""
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+from .decimation import _float_dtype
+
+# Epochs are resampled in chunks of about this many bytes.
+_CHUNK_BYTES = 64 * 2**20
+# Kernels longer than this are applied through FFTs, shorter ones directly
+#   to blocks of frames of about _BLOCK_BYTES, which stay in the CPU cache
+#   for every weight of the kernel.
+_FFT_KERNEL = 32
+_BLOCK_BYTES = 2**18
+# The period is the first autocorrelation peak at least this fraction of
+#   the highest one.
+_PEAK_FRACTION = 0.8
+
+
+# Main functions
+def estimate_period(signal, dt=1.0, min_period=None, max_period=None):
+    """Period of a periodic signal, from its autocorrelation.
+
+    The autocorrelation is computed with an FFT. Its first peak past
+    min_period (default: past the first lag at which it is negative) that
+    is nearly as high as the highest gives the period to a sample, which is
+    then refined to a fraction of a sample from the peak at the largest
+    multiple of the period in the recording.
+
+    Parameters
+    ----------
+    signal : numpy.ndarray
+        1d recording, evenly sampled
+    dt : float
+        sampling interval, in the units wanted for the period
+    min_period, max_period : float
+        range of periods to search, in the units of dt. Defaults to the
+        first negative autocorrelation and half the recording.
+
+    Returns
+    -------
+    period : float
+        in the units of dt, or None when no period is found
+    """
+    signal = np.asarray(signal, dtype=float)
+    assert signal.ndim == 1, 'signal should be 1d'
+    number_frames = signal.shape[0]
+
+    # Autocorrelation, through the power spectrum of the zero padded signal.
+    centred = signal - signal.mean()
+    size = 1 << int(2 * number_frames - 1).bit_length()
+    spectrum = np.fft.rfft(centred, n=size)
+    acf = np.fft.irfft(spectrum.real ** 2 + spectrum.imag ** 2, n=size)
+    acf = acf[:number_frames // 2 + 1]
+    if acf[0] <= 0:
+        print("The signal is constant: it has no period.")
+        return None
+
+    if min_period is None:
+        negative = np.flatnonzero(acf < 0)
+        lo = negative[0] if negative.size else acf.shape[0]
+    else:
+        lo = max(int(np.ceil(min_period / dt)), 1)
+    hi = acf.shape[0] - 1
+    if max_period is not None:
+        hi = min(int(np.floor(max_period / dt)), hi)
+    if lo >= hi:
+        print("No period to search for within the recording.")
+        return None
+    # Peaks at multiples of the period are about as high as the first,
+    #   and higher when the period is a fraction of a sample off a whole
+    #   number, so the first high enough is taken.
+    high = acf[lo:hi + 1] >= _PEAK_FRACTION * acf[lo:hi + 1].max()
+    first = lo + int(np.argmax(high))
+    last = first + int(np.argmin(high[first - lo:]))
+    if last == first:
+        last = hi + 1
+    period = _peak(acf, first + int(np.argmax(acf[first:last])))
+
+    # Refine at ever larger multiples of the period: the peak at multiple
+    #   m is found to a fraction of a sample as well, which is that
+    #   fraction divided by m at the period itself. Doubling m keeps the
+    #   error of each prediction within a sample or so.
+    multiple = 2
+    while multiple * period < acf.shape[0] - 3:
+        near = int(round(multiple * period))
+        first = max(near - 2, 1)
+        peak = first + int(np.argmax(acf[first:near + 3]))
+        period = _peak(acf, peak) / multiple
+        multiple *= 2
+    return period * dt
+
+
+def fold(signal, period, dt=1.0, start=0):
+    """Cut a recording into consecutive epochs of one period each.
+
+    Parameters
+    ----------
+    signal : numpy.ndarray or numpy.memmap
+        1d recording, evenly sampled
+    period : float
+        in the units of dt, e.g. from estimate_period()
+    dt : float
+        sampling interval
+    start : int
+        index of the first sample of the first epoch
+
+    Returns
+    -------
+    M : numpy.ndarray
+        2d matrix for firecracker(): Time within the epoch x epochs.
+        A read-only view of signal when period is a whole number of
+        samples, or near enough that the epochs drift by less than a
+        sample over the recording, else resampled by linear
+        interpolation.
+    time : numpy.ndarray
+        1d time values within the epoch, from 0, every dt
+    """
+    assert np.ndim(signal) == 1, 'signal should be 1d'
+    assert period > 0 and dt > 0, 'period and dt should be positive'
+    samples = period / dt
+    whole = round(samples)
+    available = signal.shape[0] - start
+    # A period within a fraction of a sample of a whole number, as from
+    #   estimate_period(), is taken as whole when the epochs drift by less
+    #   than a sample over the whole recording.
+    exact = whole >= 1 and \
+        abs(samples - whole) * (available // whole) < 1
+
+    # Every epoch has as many frames as fit in the shortest one.
+    number_frames = whole if exact else int(np.floor(samples))
+    if exact:
+        number_epochs = available // whole
+    else:
+        # Interpolation reads one sample past the last frame of an epoch.
+        number_epochs = int(np.floor((available - number_frames - 1) /
+                                     samples)) + 1
+    if number_frames < 2 or number_epochs < 1:
+        print("The recording is shorter than one period.")
+        return None, None
+
+    time = np.arange(number_frames) * dt
+    if exact:
+        stride = signal.strides[0]
+        epochs = as_strided(signal[start:], shape=(number_epochs, whole),
+                            strides=(whole * stride, stride),
+                            subok=True, writeable=False)
+    else:
+        epochs = _resample_epochs(signal, start, samples, number_epochs,
+                                  number_frames)
+    return epochs.T, time
+
+
+def diff(M, time, order=1):
+    """Differences between consecutive frames of every series.
+
+    Parameters
+    ----------
+    M : numpy.ndarray
+        2d matrix of time-series data: Time x series
+    time : numpy.ndarray
+        1d time values
+    order : int
+        number of times differences are taken
+
+    Returns
+    -------
+    M : numpy.ndarray
+        order fewer frames than M
+    time : numpy.ndarray
+        time of the later frame of each difference, e.g. daily new cases
+        are dated by the day they were counted
+    """
+    assert isinstance(order, int) and order >= 0, \
+        'order should be a non-negative int'
+    if order == 0:
+        return M, time
+    return np.diff(M, n=order, axis=0), np.asarray(time)[order:]
+
+
+def smooth(M, time, window):
+    """Moving weighted average of every series.
+
+    Only frames with a full window are kept (numpy's "valid" convolution).
+
+    Parameters
+    ----------
+    M : numpy.ndarray
+        2d matrix of time-series data: Time x series
+    time : numpy.ndarray
+        1d time values
+    window : int or numpy.ndarray
+        int: number of frames of a Hann window (numpy.hanning, the same
+            as scipy.signal.hann, zero at both ends).
+        1d array: weights of the kernel, convolved as numpy.convolve does.
+        Either is scaled to sum to 1.
+
+    Returns
+    -------
+    M : numpy.ndarray
+        len(window) - 1 fewer frames than M
+    time : numpy.ndarray
+        time of the middle of each window
+    """
+    if np.ndim(window) == 0:
+        assert int(window) == window and window > 0, \
+            'window should be a positive int or a 1d array'
+        kernel = np.hanning(int(window))
+    else:
+        kernel = np.asarray(window, dtype=float)
+    assert kernel.ndim == 1 and kernel.sum() != 0, \
+        'window weights should be 1d and not sum to 0'
+    kernel = kernel / kernel.sum()
+
+    M = np.asarray(M)
+    time = np.asarray(time)
+    size = kernel.shape[0]
+    number_frames = M.shape[0] - size + 1
+    if number_frames < 1:
+        print("The window is longer than the series.")
+        return None, None
+    if size > _FFT_KERNEL:
+        smoothed = _convolve_fft(M, kernel)
+    else:
+        smoothed = _convolve_direct(M, kernel)
+    centre = (time[:number_frames] + time[size - 1:]) / 2
+    return smoothed, centre
+
+
+def filter_frames(M, time, window=None, order=0):
+    """diff(M, time, order) then smooth() with window, as
+    firecracker(..., diff=order, smooth=window) does.
+
+    Returns M and time unchanged when both are left out, or (None, None)
+    when the series are too short.
+    """
+    M, time = diff(M, time, order)
+    if window is None:
+        return M, time
+    return smooth(M, time, window)
+
+
+# Helper functions
+def _convolve_direct(M, kernel):
+    """Valid convolution of each column of M with a short kernel: one
+    multiply-add of shifted frames per weight, a block of frames at a
+    time."""
+    size = kernel.shape[0]
+    number_frames = M.shape[0] - size + 1
+    dtype = _float_dtype(M.dtype)
+    result = np.empty((number_frames,) + M.shape[1:], dtype=dtype)
+    # numpy.convolve flips the kernel.
+    weights = kernel[::-1]
+    step = max(_BLOCK_BYTES // max(result[:1].nbytes, 1), 1)
+    scratch = np.empty((min(step, number_frames),) + M.shape[1:],
+                       dtype=dtype)
+    for start in range(0, number_frames, step):
+        stop = min(start + step, number_frames)
+        block = result[start:stop]
+        product = scratch[:stop - start]
+        np.multiply(M[start:stop], weights[0], out=block)
+        for shift in range(1, size):
+            np.multiply(M[start + shift:stop + shift], weights[shift],
+                        out=product)
+            block += product
+    return result
+
+
+def _convolve_fft(M, kernel):
+    """Valid convolution of each column of M with a long kernel, through
+    FFTs (overlap-save).
+
+    The frames are cut into overlapping segments of a few kernel lengths,
+    all of which are transformed in one call, a chunk of columns at a time,
+    so that FFTs cost log(kernel length) per frame rather than log(frames).
+    """
+    size = kernel.shape[0]
+    number_frames = M.shape[0] - size + 1
+    length = 1 << int(8 * size - 1).bit_length()
+    step = length - size + 1
+    number_segments = -(-number_frames // step)
+    kernel_fft = np.fft.rfft(kernel, n=length)[:, np.newaxis]
+
+    columns = M.reshape(M.shape[0], -1)
+    result = np.empty((number_frames, columns.shape[1]),
+                      dtype=_float_dtype(M.dtype))
+    # The spectra of a column take about 16 bytes per frame.
+    width = max(_CHUNK_BYTES // (16 * number_segments * length), 1)
+    for first in range(0, columns.shape[1], width):
+        chunk = columns[:, first:first + width]
+        padded = np.zeros((number_segments * step + size - 1,
+                           chunk.shape[1]))
+        padded[:M.shape[0]] = chunk
+        rows, cols = padded.strides
+        segments = as_strided(padded,
+                              shape=(number_segments, length,
+                                     chunk.shape[1]),
+                              strides=(step * rows, rows, cols),
+                              writeable=False)
+        spectra = np.fft.rfft(segments, axis=1) * kernel_fft
+        circular = np.fft.irfft(spectra, n=length, axis=1)
+        # The first size - 1 frames of each segment wrap around.
+        valid = circular[:, size - 1:].reshape(-1, chunk.shape[1])
+        result[:, first:first + width] = valid[:number_frames]
+    return result.reshape((number_frames,) + M.shape[1:])
+
+
+def _resample_epochs(signal, start, samples, number_epochs, number_frames):
+    """Epochs x frames, each epoch starting samples after the previous one
+    and interpolated between the samples on either side."""
+    epochs = np.empty((number_epochs, number_frames),
+                      dtype=_float_dtype(signal.dtype))
+    offsets = np.arange(number_frames)
+    step = max(_CHUNK_BYTES // max(epochs[:1].nbytes, 1), 1)
+    for first in range(0, number_epochs, step):
+        k = np.arange(first, min(first + step, number_epochs))
+        origin = start + k * samples
+        lower = np.floor(origin).astype(np.intp)
+        weight = (origin - lower)[:, np.newaxis]
+        index = lower[:, np.newaxis] + offsets
+        epochs[k] = signal[index] * (1 - weight) + signal[index + 1] * weight
+    return epochs
+
+
+def _peak(y, i):
+    """Position of the peak of y at sample i, to a fraction of a sample:
+    the vertex of the parabola through y[i - 1], y[i] and y[i + 1]."""
+    if i < 1 or i > y.shape[0] - 2:
+        return float(i)
+    curvature = y[i - 1] - 2 * y[i] + y[i + 1]
+    if curvature >= 0:
+        return float(i)
+    return i + 0.5 * (y[i - 1] - y[i + 1]) / curvature
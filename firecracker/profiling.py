@@ -0,0 +1,242 @@
+""" Per-stage timing of firecracker().
+
+Pass a Profile as firecracker(..., profile=profile) to record, for each
+stage of making the figure, its wall time, the growth of the process's peak
+memory and the number of artists in the figure. Optionally allocations are
+traced too. The stages are:
+
+    prepare     open, filter (smooth, diff), layout, stats, limits, read
+                (files and memmaps), decimate, upsample, color_mapping
+                (color values and colors, a chunk of frames at a time)
+    render      axes, gradients, fills, markers (per series and added up,
+                but for layers, which draw the gradients and fills of all
+                series at once), image (raster backend), colorbar
+    update      FirecrackerPlot.update() and append(): filter, stats,
+                limits, decimate, upsample, color_mapping, artists, draw
+    zoom        each zoom or pan with zoom_detail: read, decimate,
+                upsample, color_mapping, artists
+
+The default measurements cost a few microseconds per stage, so a Profile
+can be left on in production, feeding a logger through callback:
+
+    >>> profile = Profile(callback=lambda record: log.info("%s", record))
+    >>> fig = firecracker(M, time, "Voltage", profile=profile)
+    >>> profile.savefig(fig, "figure.png")
+    >>> print(profile.summary())
+"""
+
+import contextlib
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class Profile:
+    """Records of the stages of one or more firecracker() calls.
+
+    Parameters
+    ----------
+    callback : callable
+        called with each record as its stage ends, e.g. to log it
+    allocations : bool
+        also trace allocations with tracemalloc: the bytes allocated at
+        the peak of each stage. Accurate but slow (several times slower);
+        meant for investigation rather than production.
+
+    Attributes
+    ----------
+    records : list of dict
+        one per stage, in the order the stages started:
+            "stage": name, nested stages as "render/gradients"
+            "seconds": wall time
+            "calls": times the stage ran (stages inside loops are
+                added up into one record per loop)
+            "max_rss_growth": growth of the process's peak resident
+                memory, in bytes (None where unavailable)
+            "artists": artists in the figure at the end of the stage
+                (None before the figure exists)
+            "traced_peak": peak bytes allocated (allocations=True only,
+                None for stages inside loops)
+    """
+
+    def __init__(self, callback=None, allocations=False):
+        self.callback = callback
+        self.allocations = allocations
+        self.records = []
+        self.figure = None
+        self._names = []
+        self._peaks = []
+
+    @contextlib.contextmanager
+    def stage(self, name, fig=None):
+        """Context manager recording the code it runs as stage name.
+
+        Artists are counted in fig, or else in the last figure given to a
+        stage.
+        """
+        if fig is not None:
+            self.figure = fig
+        self._names.append(name)
+        record = {'stage': "/".join(self._names), 'seconds': None,
+                  'calls': 1, 'max_rss_growth': None, 'artists': None}
+        # Listed when it starts, so that stages read in nesting order.
+        self.records.append(record)
+        started_tracing = self.allocations and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if self.allocations:
+            traced = self._start_peak()
+        rss = _max_rss()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            if rss is not None:
+                record['max_rss_growth'] = _max_rss() - rss
+            if self.allocations:
+                record['traced_peak'] = self._end_peak() - traced
+                if started_tracing:
+                    tracemalloc.stop()
+            if self.figure is not None:
+                record['artists'] = count_artists(self.figure)
+            self._names.pop()
+            if self.callback is not None:
+                self.callback(record)
+
+    def add(self, name, seconds, calls):
+        """Record a stage that was timed by the caller, e.g. in a loop."""
+        record = {'stage': "/".join(self._names + [name]),
+                  'seconds': seconds, 'calls': calls,
+                  'max_rss_growth': None, 'artists': None}
+        if self.allocations:
+            record['traced_peak'] = None
+        self.records.append(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def _start_peak(self):
+        """Start measuring the traced peak of a stage; returns the bytes
+        traced now.
+
+        tracemalloc has a single peak, so it is reset for each stage and
+        each enclosing stage keeps the largest peak seen by its own.
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], peak)
+        tracemalloc.reset_peak()
+        self._peaks.append(current)
+        return current
+
+    def _end_peak(self):
+        """Traced peak of the stage that ends, in bytes."""
+        peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+        if self._peaks:
+            self._peaks[-1] = max(self._peaks[-1], peak)
+        return peak
+
+    def savefig(self, fig, *args, **kwargs):
+        """fig.savefig(*args, **kwargs), recorded as stage "savefig"."""
+        with self.stage("savefig", fig):
+            fig.savefig(*args, **kwargs)
+
+    def totals(self):
+        """Total seconds of each stage name over all records."""
+        totals = {}
+        for record in self.records:
+            totals[record['stage']] = (totals.get(record['stage'], 0) +
+                                       record['seconds'])
+        return totals
+
+    def summary(self):
+        """The records as a table, one line per stage."""
+        lines = ["{:32s} {:>9s} {:>6s} {:>12s} {:>8s}".format(
+            "stage", "ms", "calls", "rss growth", "artists")]
+        for r in self.records:
+            lines.append("{:32s} {:9.2f} {:6d} {:>12s} {:>8s}".format(
+                r['stage'], r['seconds'] * 1000, r['calls'],
+                _text(r['max_rss_growth']), _text(r['artists'])))
+        return "\n".join(lines)
+
+
+class _Tally:
+    """Time spent in a stage that runs many times, as one record.
+
+    Used inside the per-series loops, where a record per series would
+    cost more than the work timed.
+    """
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.calls = 0
+
+    @contextlib.contextmanager
+    def __call__(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.calls += 1
+
+
+def count_artists(fig):
+    """Number of artists drawn in the axes of fig."""
+    return sum(len(ax.get_children()) for ax in fig.axes)
+
+
+def _as_profile(profile):
+    """The profile argument of firecracker() as a Profile, or None.
+
+    A callable is taken as the callback of a new Profile.
+    """
+    if profile is None or isinstance(profile, Profile):
+        return profile
+    return Profile(callback=profile)
+
+
+def _watch(profile, fig):
+    """Count the artists of fig at the end of the stages that follow."""
+    if profile is not None:
+        profile.figure = fig
+
+
+def _stage(profile, name, fig=None):
+    """profile.stage(name, fig), or nothing when not profiling."""
+    if profile is None:
+        return contextlib.nullcontext()
+    return profile.stage(name, fig)
+
+
+def _tallies(profile, *names):
+    """One _Tally per name, or contexts that do nothing when not profiling.
+    """
+    if profile is None:
+        return [contextlib.nullcontext for _ in names]
+    return [_Tally() for _ in names]
+
+
+def _add_tallies(profile, names, tallies):
+    """Record the tallies of _tallies() in profile."""
+    if profile is None:
+        return
+    for name, tally in zip(names, tallies):
+        if tally.calls:
+            profile.add(name, tally.seconds, tally.calls)
+
+
+def _max_rss():
+    """Peak resident memory of the process in bytes, or None."""
+    if resource is None:
+        return None
+    # Kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _text(value):
+    return "-" if value is None else str(value)
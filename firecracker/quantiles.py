@@ -0,0 +1,140 @@
+""" Approximate quantiles of many values, in one pass and bounded memory.
+
+A QuantileSketch is a KLL sketch (Karnin, Lang and Liberty, "Optimal
+quantile approximation in streams", 2016): values are kept in levels, each
+value of level h standing for 2**h values seen. When a level is full it is
+sorted and every other value, from a random first one, moves up a level.
+The quantiles it gives are within about error x the number of values of
+the true rank, whatever their order, with 3 to 5 / error values kept.
+
+Sketches of separate parts of the data can be merged, so the quantiles of
+a memmap are worked out a chunk at a time (see limits.data_stats()), and
+those of a stream of frames a batch at a time (see FirecrackerPlot).
+
+Depends on numpy only, and is vectorized: a batch of values is sorted once
+and as many levels up as it fills, instead of value by value.
+
+    >>> sketch = QuantileSketch(error=0.001)
+    >>> for chunk in chunks:
+    ...     sketch.update(chunk)
+    >>> low, high = sketch.quantile([0.01, 0.99])
+"""
+
+import numpy as np
+
+# Capacity k of the top level for a rank error: measured to be within
+#   error on every one of 20 sketches of random, sorted and reversed
+#   values, updated in batches of 1e3 to 1e6.
+_CAPACITY_PER_ERROR = 3.0
+# Each level below the top holds this fraction of the one above, at least 2.
+_LEVEL_RATIO = 2 / 3
+
+
+class QuantileSketch:
+    """Approximate quantiles of the values given to update().
+
+    Parameters
+    ----------
+    error : float
+        rank error wanted, as a fraction of the number of values: e.g.
+        0.001 gives quantiles within 0.1 percentile of the true ones.
+    seed : int
+        of the random choices of the compactions, so that the same values
+        give the same sketch.
+
+    Attributes
+    ----------
+    count : int
+        number of values seen, NaN left out
+    min, max : float
+        smallest and largest value seen, exactly
+    """
+
+    def __init__(self, error=0.001, seed=0):
+        assert 0 < error < 1, 'error should be between 0 and 1'
+        self.error = error
+        self.k = int(np.ceil(_CAPACITY_PER_ERROR / error))
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._levels = []
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        """Add values, an array of any shape; NaN is left out."""
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        self.count += values.size
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+        # A batch of many times k values goes straight to the level where
+        #   it is about k values: every 2**level-th of the sorted batch,
+        #   from a random first one, as that many compactions would keep.
+        level = max(int(np.log2(values.size / self.k)), 0)
+        if level:
+            values = np.sort(values)
+            stride = 2**level
+            values = values[self._rng.integers(stride)::stride]
+        self._add(level, values)
+        self._compress()
+
+    def merge(self, other):
+        """Sketch of the values of both sketches, a new QuantileSketch."""
+        merged = QuantileSketch(min(self.error, other.error))
+        merged._rng = np.random.default_rng(self._rng.integers(2**32))
+        merged.count = self.count + other.count
+        merged.min = min(self.min, other.min)
+        merged.max = max(self.max, other.max)
+        for sketch in (self, other):
+            for level, values in enumerate(sketch._levels):
+                merged._add(level, values)
+        merged._compress()
+        return merged
+
+    def quantile(self, q):
+        """Approximate quantiles q (in [0, 1]) of the values seen.
+
+        0 and 1 are the exact minimum and maximum. NaN before any value.
+        """
+        q = np.asarray(q, dtype=float)
+        if self.count == 0:
+            return np.full(q.shape, np.nan)
+        values = np.concatenate(self._levels)
+        weights = np.concatenate([np.full(v.size, 2.0**h)
+                                  for h, v in enumerate(self._levels)])
+        order = np.argsort(values, kind='stable')
+        values = values[order]
+        # Each value stands for the ranks up to its cumulative weight.
+        ranks = np.cumsum(weights[order])
+        i = np.searchsorted(ranks, q * ranks[-1], side='left')
+        result = values[np.clip(i, 0, values.size - 1)]
+        result = np.where(q <= 0, self.min, result)
+        return np.where(q >= 1, self.max, result)
+
+    def __len__(self):
+        """Number of values kept, 3 to 5 / error."""
+        return sum(v.size for v in self._levels)
+
+    def _add(self, level, values):
+        while len(self._levels) <= level:
+            self._levels.append(np.empty(0))
+        self._levels[level] = np.concatenate((self._levels[level], values))
+
+    def _compress(self):
+        """Compact every level over its capacity, from the bottom up."""
+        level = 0
+        while level < len(self._levels):
+            values = self._levels[level]
+            depth = len(self._levels) - 1 - level
+            capacity = max(int(self.k * _LEVEL_RATIO**depth), 2)
+            if values.size > capacity:
+                values = np.sort(values)
+                # An odd value out stays on this level.
+                even = values.size - values.size % 2
+                self._levels[level] = values[even:]
+                self._add(level + 1,
+                          values[self._rng.integers(2):even:2])
+            level += 1
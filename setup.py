@@ -8,7 +8,6 @@ with open("README.rst", "r") as fh:
 
 setuptools.setup(
     name="firecracker",
-    py_modules=["firecracker"],
     version="1.0",
     description="DO",
     long_description=long_description,
@@ -16,8 +15,9 @@ setuptools.setup(
     author="Carl Michael Gaspar",
     author_email="carl.michael.gaspar@icloud.com",
     url="https://github.com/SourCherries/firecracker",
-    packages=setuptools.find_packages(),
-    install_requires=['numpy', 'matplotlib', 'scipy'],
+    packages=setuptools.find_packages(exclude=["benchmarks",
+                                               "benchmarks.*"]),
+    install_requires=['numpy', 'matplotlib'],
     requires_python=">=3.6",
     classifiers=[
         "Intended Audience :: Academics",
@@ -0,0 +1,20 @@
+import numpy as np
+
+from firecracker import RenderCache
+from firecracker.cache import _key
+
+
+def test_slices_of_one_memmap_have_their_own_keys(tmp_path):
+    fname = tmp_path / "data.npy"
+    np.save(fname, np.random.default_rng(0).normal(size=(1000, 3)))
+    M = np.load(fname, mmap_mode="r")
+    time = np.arange(100.0)
+
+    assert _key(M[0:100], time, {}, ()) != _key(M[500:600], time, {}, ())
+    assert _key(M[0:100], time, {}, ()) == _key(M[0:100], time, {}, ())
+
+    cache = RenderCache()
+    first = cache.savefig(M[0:100], time, "Value")
+    second = cache.savefig(M[500:600], time, "Value")
+    assert cache.stats()['hits'] == 0
+    assert first != second
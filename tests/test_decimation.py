@@ -0,0 +1,23 @@
+import numpy as np
+
+from firecracker.decimation import decimate_minmax
+
+
+def test_decimate_minmax_puts_every_frame_in_a_bucket():
+    rng = np.random.default_rng(0)
+    M = rng.normal(size=(1003, 3))
+    time = np.arange(1003.0)
+    M[1002, 1] = 10
+
+    time_out, M_out = decimate_minmax(time, M, 10)
+    assert M_out.shape == (20, 3)
+    assert time_out[0] == 0 and time_out[-1] == 1002
+    np.testing.assert_array_equal(M_out.min(axis=0), M.min(axis=0))
+    np.testing.assert_array_equal(M_out.max(axis=0), M.max(axis=0))
+
+
+def test_decimate_minmax_keeps_min_and_max_in_order():
+    M = np.array([[0.0], [5], [-5], [1], [2], [-1], [3], [4], [0]])
+    time_out, M_out = decimate_minmax(np.arange(9.0), M, 3)
+    np.testing.assert_array_equal(M_out[:, 0], [5, -5, 2, -1, 4, 0])
+    np.testing.assert_array_equal(time_out, [0, 2, 3, 5, 6, 8])
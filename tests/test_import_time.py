@@ -0,0 +1,62 @@
+""" What importing firecracker costs: each import runs in a fresh
+interpreter, which must not load the modules that part of the package
+does without.
+
+    import firecracker                      nothing but the package itself
+    data preparation modules                numpy, but never matplotlib
+    from firecracker import firecracker     matplotlib, but never pyplot
+
+Import times vary by tens of ms from run to run once numpy or matplotlib
+is loaded, so only the package itself, which loads neither, is timed.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PREP = ("import firecracker.decimation, firecracker.limits, "
+        "firecracker.colors, firecracker.io, firecracker.preprocess, "
+        "firecracker.quantiles")
+CORE = "from firecracker import firecracker"
+
+# Budget of the package import, far above the ~1 ms it takes.
+PACKAGE_MS = 50
+
+PROBE = """
+import sys, time
+t = time.perf_counter()
+{statement}
+t = time.perf_counter() - t
+print(t * 1000, *[m for m in {absent!r} if m in sys.modules])
+"""
+
+
+def _probe(statement, absent):
+    """Time in ms of statement in a fresh interpreter, and which of the
+    modules absent it loaded."""
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(statement=statement,
+                                            absent=list(absent))],
+        cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    fields = out.split()
+    return float(fields[0]), fields[1:]
+
+
+@pytest.mark.parametrize("statement, absent", [
+    ("import firecracker",
+     ["numpy", "matplotlib", "matplotlib.pyplot", "scipy"]),
+    (PREP, ["matplotlib", "matplotlib.pyplot", "scipy"]),
+    (CORE, ["matplotlib.pyplot", "scipy"]),
+])
+def test_import_loads_only_what_it_needs(statement, absent):
+    _, loaded = _probe(statement, absent)
+    assert loaded == []
+
+
+def test_package_import_time():
+    best = min(_probe("import firecracker", ())[0] for _ in range(5))
+    assert best < PACKAGE_MS
@@ -0,0 +1,13 @@
+import numpy as np
+
+from firecracker.limits import data_stats
+
+
+def test_data_stats_skips_nan():
+    M = np.arange(20.0).reshape(10, 2) / 4
+    M[5, 0] = 100
+    M[6, 1] = np.nan
+    stats = data_stats(M)
+    assert stats['min'] == 0
+    assert stats['max'] == 100
+    assert stats['absmax'] == 100
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from firecracker.preprocess import estimate_period, fold
+
+
+@pytest.mark.parametrize("number_samples", [7, 8, 9, 10, 11, 12, 13])
+def test_fold_fractional_period_stays_inside_signal(number_samples):
+    signal = np.arange(float(number_samples))
+    M, time = fold(signal, 2.5)
+    assert M.shape == (2, M.shape[1])
+    assert M.shape[1] >= 1
+    # A ramp interpolates to the ramp: epoch e starts at 2.5 e.
+    expected = 2.5 * np.arange(M.shape[1]) + time[:, np.newaxis]
+    np.testing.assert_allclose(M, expected)
+
+
+def test_fold_estimated_period_gives_a_view():
+    rng = np.random.default_rng(0)
+    phase = np.arange(24000) % 300
+    signal = (np.exp(-(phase - 150.0) ** 2 / 50) +
+              rng.normal(0, 0.1, phase.shape[0]))
+    period = estimate_period(signal)
+    assert period != 300
+    assert abs(period - 300) < 0.01
+
+    M, time = fold(signal, period)
+    assert M.shape == (300, 80)
+    assert np.shares_memory(M, signal)
+    np.testing.assert_array_equal(M[:, 1], signal[300:600])